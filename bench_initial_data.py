@@ -0,0 +1,98 @@
+import sys
+import json
+import time
+import random
+from typing import Any
+from lxml import html
+from scrape_builders import get_json_from_html
+
+def get_json_from_html_lxml(html_str: str):
+    """The previous lxml + brace-stack implementation, kept for comparison."""
+    tree = html.fromstring(html_str)
+    script_xpath: str = '//script[contains(text(), "window.__initialData__=")]'
+    script_elements = tree.xpath(script_xpath)
+    if not script_elements:
+        print("No script tag containing 'window.__initialData__ =' found.")
+
+    script_content = script_elements[0].text_content()
+    start_marker = "window.__initialData__="
+    start_index = script_content.find(start_marker)
+    if start_index == -1:
+        print("start marker 'window.__initData__=' not found")
+
+    json_start_index = start_index + len(start_marker)
+    json_string_raw = script_content[json_start_index:].strip()
+    stack: list[str] = []
+
+    json_str_raw_len: int = len(json_string_raw)
+    json_end: int = 0
+    for i in range(0, json_str_raw_len):
+        ch = json_string_raw[i]
+        if ch == "{":
+            stack.append(ch)
+        elif ch == "}":
+            _ = stack.pop()
+            if not stack:
+                json_end = i + 1
+    try:
+        json_string_raw = json_string_raw[:json_end].strip()
+    except Exception as e:
+        print(f"Exception occured when stripping json: {e}")
+
+    data: dict[str, Any] = {}
+
+    try:
+        data = json.loads(json_string_raw)
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON: {e}")
+
+    return data
+
+def make_builder_page(num_cards: int, padding_kb: int) -> bytes:
+    """Builds a synthetic builder SRP page shaped like the live one."""
+    rng = random.Random(42)
+    cards = [
+        {
+            "data": {
+                "builderId": str(100000 + i),
+                "name": f"Builder {i}",
+                "description": {"text": "Lorem ipsum dolor sit amet. " * rng.randint(5, 40)},
+                "projectCount": {"total": {"value": rng.randint(1, 60)}, "tuples": [{"value": 1}, {"value": 2}]},
+                "coverImage": {"url": f"https://imagecdn.99acres.com/builder/{i}.jpg"},
+            }
+        }
+        for i in range(num_cards)
+    ]
+    initial_data = {
+        "builderSrp": {
+            "pageData": {
+                "components": [{"data": {"cards": cards}}],
+                "basicDetails": {"resultCount": num_cards * 20},
+            }
+        }
+    }
+    filler = "<div class='tuple'>" + "x" * 1000 + "</div>"
+    body = filler * padding_kb
+    script = f"window.__initialData__={json.dumps(initial_data)};window.__other__={{\"a\":1}};"
+    page = f"<html><head><title>Builders</title></head><body>{body}<script>{script}</script>{body}</body></html>"
+    return page.encode("utf-8")
+
+def bench(func, page: bytes, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(page)
+    return (time.perf_counter() - start) / rounds
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for num_cards, padding_kb in [(10, 200), (10, 700), (500, 700)]:
+        page = make_builder_page(num_cards, padding_kb)
+        # the legacy walker keeps scanning past the object, so it only works when nothing follows
+        legacy_page = page.replace(b';window.__other__={"a":1};', b";")
+        assert get_json_from_html(page) == get_json_from_html_lxml(legacy_page)
+        legacy = bench(get_json_from_html_lxml, legacy_page, rounds)
+        fast = bench(get_json_from_html, page, rounds)
+        print(f"{len(page) / 1e6:.2f} MB, {num_cards} cards: lxml {legacy * 1000:.1f} ms, raw_decode {fast * 1000:.1f} ms, {legacy / fast:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import csv
+import hashlib
+import argparse
+from typing import Any, Callable, NamedTuple
+from urllib.parse import urlencode
+
+CATALOG_PATH = "cities_data.csv"
+
+SEARCH_QUERY = {'preference': 'S', 'area_unit': '1', 'budget_min': '0', 'res_com': 'R', 'isPreLeased': 'N'}
+
+class CatalogCity(NamedTuple):
+    alias: str
+    name: str
+    slug: str
+    city_id: str
+    keyword: str = ""
+    locality: str = ""
+
+def load_catalog(path: str = CATALOG_PATH) -> list[CatalogCity]:
+    """Reads the city catalog; rows whose alias starts with '#' are commented out."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            CatalogCity(row["alias"], row["name"], row["slug"], row["id"], row.get("keyword") or "", row.get("locality") or "")
+            for row in csv.DictReader(f)
+            if row["alias"] and not row["alias"].startswith("#")
+        ]
+
+def search_url(city: CatalogCity, mode: str) -> str:
+    """The srp search page of a city for a mode, e.g. .../search/property/rent/pune?city=19&..."""
+    params = {'city': city.city_id}
+    if city.keyword:
+        params['keyword'] = city.keyword
+    if city.locality:
+        params['locality'] = city.locality
+    return f"https://www.99acres.com/search/property/{mode}/{city.slug}?" + urlencode({**params, **SEARCH_QUERY})
+
+def builder_job(city: CatalogCity) -> dict[str, Any]:
+    """The builder listing job of a city in the shape scrape_builders.process_city expects."""
+    return {"url": f"https://www.99acres.com/builders-in-{city.slug}-bffid", "city": city.slug, "id": int(city.city_id)}
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """argparse type for --shard i/N, with 0 <= i < N."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}, got {value!r}")
+    return index, count
+
+def _stable_hash(text: str) -> int:
+    # hash() is salted per process, so shards would disagree between machines
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+def shard_cities(cities: list[CatalogCity], index: int, count: int, weights: dict[str, int] | None = None) -> list[CatalogCity]:
+    """
+    Returns the cities of shard `index` out of `count`.
+
+    Cities are taken heaviest first (ties broken by a hash of the slug) and each
+    goes to the currently lightest shard, so shards carry similar listing counts.
+    Cities without a known weight count as the average known city. Every node
+    must use the same catalog and weights to get disjoint, complete shards.
+    """
+    weights = weights or {}
+    known = [weights[city.slug] for city in cities if weights.get(city.slug)]
+    default = sum(known) / len(known) if known else 1
+    loads = [0.0] * count
+    mine = set()
+    ordered = sorted(cities, key=lambda city: (-(weights.get(city.slug) or default), _stable_hash(city.slug)))
+    for city in ordered:
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        loads[shard] += weights.get(city.slug) or default
+        if shard == index:
+            mine.add(city.slug)
+    # keep catalog order within the shard
+    return [city for city in cities if city.slug in mine]
+
+def add_catalog_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="city catalog CSV")
+    parser.add_argument("--city", dest="cities", action="append", help="crawl only this city alias or slug (repeatable)")
+    parser.add_argument("--shard", type=parse_shard, help="crawl only shard i of N, e.g. 0/4")
+    parser.add_argument("--shard-weights", help="listing store whose per-city counts balance the shards; give every node the same file")
+
+def select_cities(args: argparse.Namespace, weights_for: Callable[[str], dict[str, int]] | None = None) -> list[CatalogCity]:
+    """
+    Loads the catalog and applies --city and --shard. weights_for(store_path)
+    returns the per-city weights read from --shard-weights.
+    """
+    cities = load_catalog(args.catalog)
+    if args.cities:
+        wanted = set(args.cities)
+        cities = [city for city in cities if city.alias in wanted or city.slug in wanted]
+    if args.shard is not None:
+        weights = weights_for(args.shard_weights) if args.shard_weights and weights_for else None
+        cities = shard_cities(cities, *args.shard, weights)
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(cities)} cities")
+    return cities
@@ -0,0 +1,161 @@
+import os
+import asyncio
+import argparse
+from typing import Any, Iterable
+from decoding import dumps, loads, ResponseDecodeError
+from pipeline import PageProgress
+from sink import OutputSinks
+
+CHECKPOINT_DIR = os.path.join("output", "checkpoints")
+CHECKPOINT_INTERVAL = 60
+
+class BuilderProgress:
+    """
+    The builders of one city already written, plus the project pages fetched so
+    far for the builders still in progress, keyed by builderId.
+    """
+
+    def __init__(self, done: Iterable[str] = (), partial: dict[str, dict[str, Any]] | None = None, complete: bool = False):
+        self.done = set(done)
+        self.partial = dict(partial or {})
+        self.complete = complete
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "done": sorted(self.done),
+            # project lists keep growing while the checkpoint is serialized
+            "partial": {key: {**value, "projects": list(value.get("projects", []))} for key, value in self.partial.items()},
+            "complete": self.complete,
+        }
+
+class Checkpoint:
+    """
+    Progress of one crawl, saved every `interval` seconds so --resume can pick
+    up an interrupted run.
+
+    A save schedules the flush of every tracked sink in the same step as it
+    copies the progress, so the pages it records are exactly the ones in the
+    NDJSON file sizes it stores next to them. Parquet parts are finished at
+    the same step and recorded by name. Resuming cuts the files back to those
+    sizes and deletes the run's unrecorded parts, which drops whatever was
+    written after the last save, and skips the recorded pages and builders.
+    Seen indexes are saved in the same file. The file is replaced atomically,
+    so a crash while saving leaves the previous checkpoint in place.
+    """
+
+    def __init__(self, name: str, directory: str = CHECKPOINT_DIR, resume: bool = False, interval: float = CHECKPOINT_INTERVAL):
+        self.path = os.path.join(directory, f"{name}.json")
+        self.interval = interval
+        self.searches: dict[str, PageProgress] = {}
+        self.builders: dict[str, BuilderProgress] = {}
+        self.offsets: dict[str, int] = {}
+        self.seen_states: dict[str, Any] = {}
+        self.parquet_states: dict[str, Any] = {}
+        self.sinks: dict[str, OutputSinks] = {}
+        self._task: asyncio.Task | None = None
+        os.makedirs(directory, exist_ok=True)
+        if resume:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                state = loads(f.read())
+        except FileNotFoundError:
+            print(f"No checkpoint at {self.path}, starting from the beginning")
+            return
+        except (OSError, ResponseDecodeError) as e:
+            print(f"Checkpoint at {self.path} is unreadable, starting from the beginning: {e}")
+            return
+        self.searches = {key: PageProgress(**value) for key, value in state.get("searches", {}).items()}
+        self.builders = {city: BuilderProgress(**value) for city, value in state.get("builders", {}).items()}
+        self.offsets = dict(state.get("offsets", {}))
+        self.seen_states = dict(state.get("seen", {}))
+        self.parquet_states = dict(state.get("parquet", {}))
+        done = sum(progress.complete for progress in self.searches.values()) + sum(progress.complete for progress in self.builders.values())
+        print(f"Resuming from {self.path}: {done} searches complete, {len(self.searches) + len(self.builders) - done} in progress")
+
+    def search(self, mode: str, city: str) -> PageProgress:
+        return self.searches.setdefault(f"{mode}/{city}", PageProgress())
+
+    def builder_city(self, city: str) -> BuilderProgress:
+        return self.builders.setdefault(city, BuilderProgress())
+
+    def track(self, name: str, sinks: OutputSinks):
+        """Flushes `sinks` on every save and continues their files and seen index from the checkpoint."""
+        self.sinks[name] = sinks
+        sinks.raw.resume(self.offsets)
+        sinks.final.resume(self.offsets)
+        if sinks.columnar is not None and name in self.parquet_states:
+            sinks.columnar.resume(**self.parquet_states[name])
+        if sinks.seen is not None and name in self.seen_states:
+            sinks.seen.restore(self.seen_states[name])
+
+    def _state(self) -> dict[str, Any]:
+        return {
+            "searches": {
+                key: {"total_count": p.total_count, "last_page": p.last_page, "pages": sorted(p.pages), "complete": p.complete}
+                for key, p in self.searches.items()
+            },
+            "builders": {city: progress.state() for city, progress in self.builders.items()},
+            "seen": {name: sinks.seen.state() for name, sinks in self.sinks.items() if sinks.seen is not None},
+        }
+
+    def _write(self, state: dict[str, Any]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(dumps(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        # no await between copying the progress and scheduling the flushes
+        state = self._state()
+        flushing = [sinks.flush_nowait() for sinks in self.sinks.values()]
+        committing = {name: sinks.columnar.commit_nowait() for name, sinks in self.sinks.items() if sinks.columnar is not None}
+        for offsets in await asyncio.gather(*flushing):
+            self.offsets.update(offsets)
+        state["offsets"] = dict(self.offsets)
+        for name, parts in committing.items():
+            await parts
+            self.parquet_states[name] = self.sinks[name].columnar.state()
+        state["parquet"] = dict(self.parquet_states)
+        await asyncio.to_thread(self._write, state)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except OSError as e:
+                print(f"Failed to save checkpoint {self.path}: {e}")
+
+    def start(self):
+        """Starts saving every `interval` seconds."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        """Stops the periodic saves and saves once more."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.save()
+        print(f"Checkpoint saved to {self.path}")
+
+def add_checkpoint_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--resume", action="store_true", help="continue the interrupted run recorded in the checkpoint")
+    parser.add_argument("--checkpoint", help=f"checkpoint name under {CHECKPOINT_DIR} (default: derived from the crawl and shard)")
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL, help="seconds between checkpoint saves")
+
+def checkpoint_name(args: argparse.Namespace, crawl: str) -> str:
+    """--checkpoint, or the crawl name plus the shard, so shards on one machine keep separate checkpoints."""
+    if args.checkpoint:
+        return args.checkpoint
+    if args.shard is not None:
+        return f"{crawl}-shard{args.shard[0]}of{args.shard[1]}"
+    return crawl
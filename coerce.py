@@ -0,0 +1,14 @@
+from typing import Any
+
+def as_float(value: Any) -> float | None:
+    """A listing field as a float; None for missing, empty or non-numeric values."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def as_int(value: Any) -> int | None:
+    number = as_float(value)
+    return int(number) if number is not None else None
@@ -12,22 +12,45 @@ import hashlib
 import hmac # Added for HMAC signing
 import binascii # Added for base64 decoding errors
 from typing import Any
+from functools import lru_cache
 from get_cookies import extract_cookies_99acres
+from token_cache import TokenCache
 
-async def get_authentication_token(url: str, proxies: str) -> tuple[str, str, list[Any]]:
+token_cache = TokenCache()
+
+API_TOKEN_PATTERN = re.compile(r'__apiToken" value="([^"]+)"')
+ENCRYPTED_INPUT_PATTERN = re.compile(r'"encrypted_input":"([^"]+)"')
+
+def extract_encrypted_input(html_content: str) -> str:
+    """Returns the search's encrypted_input embedded in a search results page, or ""."""
+    match = ENCRYPTED_INPUT_PATTERN.search(html_content)
+    return match.group(1) if match else ""
+
+async def get_authentication_token(
+    url: str,
+    proxies: str | None = None,
+    city: str = "",
+    use_cache: bool = True
+) -> tuple[str, str, list[Any]]:
     """
     Fetches the authentication token from the 99acres.com homepage.
+    Results are cached on disk per url/city/proxy until the token expires;
+    `proxies` is the proxy URL the browser goes through, None for direct.
     """
     try:
+        if use_cache:
+            cached = await asyncio.to_thread(token_cache.get, url, city, proxies)
+            if cached:
+                print(f"Using cached authentication token for {city or url}")
+                return cached
 
-        # html_content, cookies = await asyncio.to_thread(extract_cookies_99acres, url, proxies)
         html_content, cookies = await asyncio.to_thread(extract_cookies_99acres, url, proxies)
 
         # with open("html_content.html", "w", encoding="utf-8") as file:
         #     file.write(html_content)
 
         api_token = ""
-        match = re.search(r'__apiToken" value="([^"]+)"', html_content)
+        match = API_TOKEN_PATTERN.search(html_content)
         if match:
             api_token = match.group(1)
             print(f"Extracted __apiToken: {api_token}")
@@ -35,14 +58,15 @@ async def get_authentication_token(url: str, proxies: str) -> tuple[str, str, li
             print("API Token not found.")
             return "", "", []
 
-        encrypted_input = ""
-        match = re.search(r'"encrypted_input":"([^"]+)"', html_content)
-        if match:
-            encrypted_input = match.group(1)
-        else:
+        encrypted_input = extract_encrypted_input(html_content)
+        if not encrypted_input:
             print("encrypted_input not found")
             return "", "", []
 
+        if use_cache:
+            expires_at = get_token_expiry(api_token)
+            await asyncio.to_thread(token_cache.put, url, city, api_token, encrypted_input, cookies, expires_at, proxies)
+
         return api_token, encrypted_input, cookies
 
     except Exception as e:
@@ -51,6 +75,27 @@ async def get_authentication_token(url: str, proxies: str) -> tuple[str, str, li
 
     return "", "", []
 
+def decode_token_payload(auth_token: str) -> dict[str, Any] | None:
+    """Decodes the JSON payload segment of a JWT without verifying it."""
+    parts: list[str] = auth_token.split('.')
+    if len(parts) != 3:
+        return None
+    payload_b64: str = parts[1]
+    padded_payload: str = payload_b64 + '=' * (-len(payload_b64) % 4)
+    try:
+        return json.loads(base64.b64decode(padded_payload.replace('-', '+').replace('_', '/')).decode('utf-8'))
+    except (ValueError, TypeError, binascii.Error) as e:
+        print(f"Error decoding token payload: {e}")
+        return None
+
+def get_token_expiry(auth_token: str) -> float | None:
+    """Returns the token's `exp` claim as a unix timestamp, if present."""
+    payload = decode_token_payload(auth_token)
+    if not payload:
+        return None
+    exp = payload.get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
 def decode_base64_string(base64_str: str) -> str | None:
     """
     Decodes a URL-safe base64 string.
@@ -141,46 +186,98 @@ def generate_auth_token(
 
     return f"{unsigned_token}.{encoded_signature}"
 
-def regenerate_api_token(auth_token: str, url: str, options_body: str) -> str | None:
-    """Decodes an existing token and generates a new one."""
-    parts: list[str] = auth_token.split('.')
-    if len(parts) == 3:
-        try:
-            # Decode the payload from the original token
-            payload_b64: str = parts[1]
-            padded_payload: str = payload_b64 + '=' * (-len(payload_b64) % 4)
-            decoded_payload: dict[str, Any] = json.loads(base64.b64decode(padded_payload.replace('-', '+').replace('_', '/')).decode('utf-8'))
-
-            # Extract salts and secret from the decoded payload
-            salt1: str | None = decoded_payload.get("s1")
-            salt2: str | None = decoded_payload.get("s2")
-            base64_secret: str | None = decoded_payload.get("s3")
-
-            if not (isinstance(salt1, str) and
-                    isinstance(salt2, str) and
-                    isinstance(base64_secret, str)):
-                print("Error: Missing or invalid salt/secret in decoded token payload.")
-                return None
-
-            # Extract query string from the URL
-            query_string: str = url.split('?', 1)[1] if '?' in url else ''
-
-            s1: str = salt1
-            s2: str = salt2
-            s3: str = base64_secret
-
-            # Generate the new token
-            new_token: str|None = generate_auth_token(s1, s2, s3, query_string, options_body)
-            return new_token
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from token payload: {e}")
+class TokenSigner:
+    """
+    Signs API requests for a single auth token.
+
+    The salts, decoded HMAC key, JWT header segment, salted MD5 prefix state and
+    webdriver hash are derived once; sign() only hashes the per-request parts.
+    """
+
+    encoded_header: str = encode_urlsafe_base64(json.dumps({"typ": "JWT", "alg": "HS256"}, separators=(',', ':')))
+
+    def __init__(self, salt1: str, salt2: str, base64_secret: str):
+        self.salt1 = salt1
+        self.salt2 = salt2
+        self.hmac_key: bytes = base64.b64decode(base64_secret)
+        self._md5_prefix = hashlib.md5(salt1.encode('utf-8'))
+        self._salt2_bytes: bytes = salt2.encode('utf-8')
+        # Assume webdriver is false for server-side generation
+        self.webdriver_hash: str = self._salted_md5("false")
+        self._hmac_prefix = hmac.new(self.hmac_key, f"{self.encoded_header}.".encode('utf-8'), hashlib.sha256)
+
+    @classmethod
+    def from_auth_token(cls, auth_token: str) -> "TokenSigner | None":
+        """Builds a signer from the s1/s2/s3 claims of an auth token."""
+        decoded_payload = decode_token_payload(auth_token)
+        if decoded_payload is None:
+            print("Invalid authentication token format.")
             return None
-        except (TypeError, binascii.Error) as e:
-            print(f"Error in base64 decoding during token regeneration: {e}")
+
+        salt1 = decoded_payload.get("s1")
+        salt2 = decoded_payload.get("s2")
+        base64_secret = decoded_payload.get("s3")
+        if not (isinstance(salt1, str) and
+                isinstance(salt2, str) and
+                isinstance(base64_secret, str)):
+            print("Error: Missing or invalid salt/secret in decoded token payload.")
             return None
-        except Exception as e:
-            print(f"An unexpected error occurred during token regeneration: {e}")
+
+        try:
+            return cls(salt1, salt2, base64_secret)
+        except (TypeError, binascii.Error) as e:
+            print(f"Error decoding base64 secret for HMAC key: {e}")
             return None
-    else:
-        print(f"Invalid authentication token format. Expected 3 parts, got {len(parts)}.")
+
+    def _salted_md5(self, text: str) -> str:
+        md5 = self._md5_prefix.copy()
+        md5.update(text.encode('utf-8'))
+        md5.update(self._salt2_bytes)
+        return md5.hexdigest()
+
+    def _sign_query(self, query_string: str, request_body: str, issued_time: float) -> str:
+        payload: dict[str, Any] = {
+            "iat": issued_time,
+            "exp": issued_time + 120,
+            "hq": self._salted_md5(query_string), # Query Hash
+            "wb": self.webdriver_hash # Webdriver Hash
+        }
+        if request_body:
+            payload["hb"] = self._salted_md5(request_body) # Body Hash
+
+        encoded_payload: str = encode_urlsafe_base64(json.dumps(payload, separators=(',', ':')))
+        mac = self._hmac_prefix.copy()
+        mac.update(encoded_payload.encode('utf-8'))
+        encoded_signature: str = base64.b64encode(mac.digest()).decode('utf-8').replace('+', '-').replace('/', '_').rstrip('=')
+        return f"{self.encoded_header}.{encoded_payload}.{encoded_signature}"
+
+    def sign(self, url: str, request_body: str = "", issued_time: float | None = None) -> str:
+        """Returns the apitoken header value for a request to url."""
+        query_string: str = url.split('?', 1)[1] if '?' in url else ''
+        if issued_time is None:
+            issued_time = round(time.time(), 3)
+        return self._sign_query(query_string, request_body, issued_time)
+
+    def sign_many(self, urls: list[str], request_body: str = "") -> list[str]:
+        """
+        Signs a planned batch of URLs with one shared issue time.
+        Tokens are valid for 120 seconds, so sign a batch just before sending it.
+        """
+        issued_time = round(time.time(), 3)
+        return [self.sign(url, request_body, issued_time) for url in urls]
+
+@lru_cache(maxsize=64)
+def get_token_signer(auth_token: str) -> TokenSigner | None:
+    """Returns the cached signer for an auth token."""
+    return TokenSigner.from_auth_token(auth_token)
+
+def regenerate_api_token(auth_token: str, url: str, options_body: str) -> str | None:
+    """Generates a new request token signed with the salts of an existing one."""
+    signer = get_token_signer(auth_token)
+    if signer is None:
+        return None
+    try:
+        return signer.sign(url, options_body)
+    except Exception as e:
+        print(f"An unexpected error occurred during token regeneration: {e}")
         return None
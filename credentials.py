@@ -0,0 +1,231 @@
+import time
+import asyncio
+from functools import partial
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, NamedTuple
+from curl_cffi import AsyncSession
+from common import get_authentication_token, get_token_expiry, get_token_signer, token_cache
+from common import TokenSigner, extract_encrypted_input
+import transport
+from transport import SEARCH_PAGE
+from rate_limit import AdaptiveLimiter
+from proxy_pool import Egress, ProxyPool
+
+DEFAULT_LIFETIME = 20 * 60
+REFRESH_MARGIN = 60
+MAX_ATTEMPTS = 2
+RETRY_DELAY = 5
+MAX_REFRESH_BACKOFF = 5 * 60
+MAX_FAILED_ROUNDS = 5
+AUTH_FAILURE_STATUSES = (401, 403)
+
+class Credentials(NamedTuple):
+    auth_token: str
+    encrypted_input: str
+    cookies: dict[str, Any]
+    signer: TokenSigner
+    expires_at: float
+
+class CityCredentials:
+    """
+    Holds the current credential set for one search URL and renews it in the
+    background shortly before the auth token expires.
+
+    Callers take an immutable Credentials snapshot from `current`, so a refresh
+    swaps the set atomically for every later request. Requests rejected for auth
+    call `invalidate(snapshot)`; concurrent callers all await the same in-flight
+    refresh instead of each launching a browser.
+
+    The browser goes through the proxy of `egress`, and so must every request
+    made with these credentials: the site ties the cookies to that address.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        city: str = "",
+        egress: Egress | None = None,
+        refresh_margin: float = REFRESH_MARGIN,
+        default_lifetime: float = DEFAULT_LIFETIME
+    ):
+        self.url = url
+        self.city = city
+        self.egress = egress
+        self.proxy = egress.proxy if egress is not None else None
+        self.refresh_margin = refresh_margin
+        self.default_lifetime = default_lifetime
+        self.current: Credentials | None = None
+        self.search_inputs: dict[str, asyncio.Task] = {}
+        self._refresh_task: asyncio.Task | None = None
+        self._scheduler_task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "CityCredentials":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self) -> Credentials | None:
+        """Acquires the first credential set (from the token cache if possible) and starts the scheduler."""
+        if self.current is None:
+            self.current = await self._acquire(use_cached=True)
+        if self._scheduler_task is None:
+            self._scheduler_task = asyncio.create_task(self._schedule_refreshes())
+        return self.current
+
+    async def close(self):
+        for task in (self._scheduler_task, self._refresh_task, *self.search_inputs.values()):
+            if task and not task.done():
+                task.cancel()
+        self._scheduler_task = None
+
+    async def _acquire(self, use_cached: bool) -> Credentials | None:
+        for attempt in range(MAX_ATTEMPTS):
+            if not use_cached or attempt:
+                await asyncio.to_thread(token_cache.invalidate, self.url, self.city, self.proxy)
+            auth_token, encrypted_input, cookies = await get_authentication_token(self.url, self.proxy, self.city)
+            signer = get_token_signer(auth_token) if auth_token else None
+            if auth_token and cookies and encrypted_input and signer:
+                expires_at = get_token_expiry(auth_token) or time.time() + self.default_lifetime
+                return Credentials(auth_token, encrypted_input, dict(cookies), signer, expires_at)
+            print(f"Could not get tokens for {self.city or self.url}, attempt {attempt + 1}")
+            if attempt + 1 < MAX_ATTEMPTS:
+                await asyncio.sleep(RETRY_DELAY)
+        return None
+
+    async def refresh(self) -> Credentials | None:
+        """Starts a refresh, or joins the one already in flight."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self) -> Credentials | None:
+        print(f"Refreshing credentials for {self.city or self.url}")
+        credentials = await self._acquire(use_cached=False)
+        if credentials is not None:
+            self.current = credentials
+            self.search_inputs.clear()
+            if self._scheduler_task is not None and self._scheduler_task.done():
+                # the scheduler gave up after failed rounds; this set expires too
+                self._scheduler_task = asyncio.create_task(self._schedule_refreshes())
+        return self.current
+
+    async def encrypted_input_for(self, session: AsyncSession, search_url: str, limiter: AdaptiveLimiter | None = None) -> str | None:
+        """
+        Returns the encrypted_input of another search (e.g. the buy search of a city
+        whose credentials came from its rent search). The search page is fetched over
+        HTTP with the current cookies; only if that fails is a browser launched for it.
+        Concurrent callers share one lookup per search, like refresh(); a failed
+        lookup is forgotten so the next caller tries again.
+        """
+        credentials = self.current
+        if credentials is None:
+            return None
+        if search_url == self.url:
+            return credentials.encrypted_input
+        task = self.search_inputs.get(search_url)
+        if task is None:
+            task = self.search_inputs[search_url] = asyncio.create_task(self._lookup_encrypted_input(session, search_url, credentials, limiter))
+        encrypted_input = await asyncio.shield(task)
+        if encrypted_input is None and self.search_inputs.get(search_url) is task:
+            del self.search_inputs[search_url]
+        return encrypted_input
+
+    async def _lookup_encrypted_input(
+        self,
+        session: AsyncSession,
+        search_url: str,
+        credentials: Credentials,
+        limiter: AdaptiveLimiter | None
+    ) -> str | None:
+        encrypted_input = ""
+        try:
+            async with limiter[SEARCH_PAGE.name] if limiter is not None else nullcontext() as rate:
+                response = await transport.get(session, SEARCH_PAGE, search_url, {'referer': self.url}, rate, self.egress, cookies=credentials.cookies)
+            if response.status_code == 200:
+                encrypted_input = extract_encrypted_input(response.text)
+            else:
+                print(f"Search page {search_url} returned {response.status_code}")
+        except Exception as e:
+            print(f"Could not fetch search page {search_url}: {e}")
+
+        if not encrypted_input:
+            print(f"Falling back to the browser for the encrypted_input of {search_url}")
+            _, encrypted_input, _ = await get_authentication_token(search_url, self.proxy, self.city)
+        return encrypted_input or None
+
+    async def invalidate(self, stale: Credentials | None) -> Credentials | None:
+        """Reports that `stale` was rejected; returns the replacement set."""
+        if self.current is not stale and self.current is not None:
+            return self.current
+        return await self.refresh()
+
+    async def _schedule_refreshes(self):
+        # every failed round costs MAX_ATTEMPTS browser launches, so back off
+        # between rounds and leave it to invalidate() after MAX_FAILED_ROUNDS
+        failed_rounds = 0
+        while True:
+            credentials = self.current
+            if credentials is None or failed_rounds:
+                delay = min(RETRY_DELAY * 2 ** failed_rounds, MAX_REFRESH_BACKOFF)
+            else:
+                delay = max(credentials.expires_at - self.refresh_margin - time.time(), 0)
+            await asyncio.sleep(delay)
+            if self.current is not credentials:
+                failed_rounds = 0
+                continue
+            await self.refresh()
+            if self.current is not credentials:
+                failed_rounds = 0
+                continue
+            failed_rounds += 1
+            if failed_rounds >= MAX_FAILED_ROUNDS:
+                print(f"Stopping scheduled refreshes for {self.city or self.url} after {failed_rounds} failed rounds")
+                return
+
+class CredentialsPool:
+    """
+    Keeps the CityCredentials of the most recently used searches open, for
+    queue workers that pick up pages of many cities in no particular order.
+    Beyond max_open, the least recently used set stops its refresh scheduler.
+    Each set holds an egress of `proxies` while it is open.
+    """
+
+    def __init__(self, max_open: int = 4, proxies: ProxyPool | None = None):
+        self.max_open = max_open
+        self.proxies = proxies or ProxyPool()
+        self._open: OrderedDict[tuple[str, str], tuple[CityCredentials, asyncio.Task]] = OrderedDict()
+
+    async def _start(self, credentials: CityCredentials) -> CityCredentials:
+        await credentials.start()
+        return credentials
+
+    def _release(self, credentials: CityCredentials, task: asyncio.Task):
+        # the egress was acquired with the credentials, whether or not they ever started
+        self.proxies.release(credentials.egress)
+        if not task.cancelled() and task.exception() is None:
+            asyncio.ensure_future(credentials.close())
+
+    async def get(self, url: str, city: str = "") -> CityCredentials:
+        """Returns the started credentials of url/city, acquiring them on first use."""
+        key = (url, city)
+        entry = self._open.get(key)
+        if entry is None:
+            credentials = CityCredentials(url, city, self.proxies.acquire())
+            entry = self._open[key] = (credentials, asyncio.create_task(self._start(credentials)))
+            while len(self._open) > self.max_open:
+                _, (evicted, task) = self._open.popitem(last=False)
+                task.add_done_callback(partial(self._release, evicted))
+        self._open.move_to_end(key)
+        return await asyncio.shield(entry[1])
+
+    async def close(self):
+        entries = list(self._open.values())
+        self._open.clear()
+        outcomes = await asyncio.gather(*(task for _, task in entries), return_exceptions=True)
+        for (credentials, _), outcome in zip(entries, outcomes):
+            self.proxies.release(credentials.egress)
+            if outcome is credentials:
+                await credentials.close()
@@ -0,0 +1,147 @@
+import json
+from typing import Any, TypedDict
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class ResponseDecodeError(ValueError):
+    """The response body was not the JSON document we expected."""
+
+class MapDetails(TypedDict, total=False):
+    LATITUDE: Any
+    LONGITUDE: Any
+
+class PropertyXid(TypedDict, total=False):
+    AMENITIES: Any
+
+class PropertyLocation(TypedDict, total=False):
+    ADDRESS: Any
+    CITY_NAME: Any
+    LOCALITY_NAME: Any
+
+class Property(TypedDict, total=False):
+    PROP_ID: Any
+    PROP_NAME: Any
+    DESCRIPTION: Any
+    SECONDARY_TAGS: list[Any] | None
+    MAP_DETAILS: MapDetails | None
+    PHOTO_URL: Any
+    PROPERTY_IMAGES: list[Any] | None
+    THUMBNAIL_IMAGES: list[Any] | None
+    MIN_PRICE: Any
+    MAX_PRICE: Any
+    PRICE_SQFT: Any
+    PROPERTY_TYPE: Any
+    GATED: Any
+    xid: PropertyXid | None
+    SUPERBUILTUP_SQFT: Any
+    POSTING_DATE__U: Any
+    UPDATE_DATE__U: Any
+    location: PropertyLocation | None
+    TOTAL_FLOOR: Any
+    BEDROOM_NUM: Any
+
+class SearchResponse(TypedDict, total=False):
+    count: Any
+    properties: list[Property]
+
+class ProjectSearchResponse(TypedDict, total=False):
+    # project records are stored verbatim as the builder's scraped_properties
+    newProjects: list[dict[str, Any]]
+    secondaryNewProjects: list[dict[str, Any]]
+
+def _typed_keys(schema: type) -> dict[str, Any]:
+    """Returns {field: nested field map or None} for a TypedDict schema."""
+    nested = {}
+    for name, annotation in schema.__annotations__.items():
+        candidates = getattr(annotation, "__args__", (annotation,))
+        typed_dict = next((c for c in candidates if isinstance(c, type) and hasattr(c, "__total__")), None)
+        nested[name] = _typed_keys(typed_dict) if typed_dict else None
+    return nested
+
+PROPERTY_FIELDS = _typed_keys(Property)
+
+def project_fields(record: Any, fields: dict[str, Any]) -> Any:
+    """Keeps only `fields` (recursively) of a fully decoded record."""
+    if not isinstance(record, dict):
+        return record
+    projected = {}
+    for name, nested in fields.items():
+        if name in record:
+            value = record[name]
+            projected[name] = project_fields(value, nested) if nested else value
+    return projected
+
+if msgspec is not None:
+    _search_decoder = msgspec.json.Decoder(SearchResponse)
+    _project_search_decoder = msgspec.json.Decoder(ProjectSearchResponse)
+    _generic_decoder = msgspec.json.Decoder()
+
+_DECODE_ERRORS: tuple[type[Exception], ...] = (ValueError,) + ((msgspec.DecodeError,) if msgspec is not None else ())
+
+def loads(content: bytes | str) -> Any:
+    """Decodes JSON with the fastest available library."""
+    try:
+        if msgspec is not None:
+            return _generic_decoder.decode(content)
+        if orjson is not None:
+            return orjson.loads(content)
+        return json.loads(content)
+    except _DECODE_ERRORS as e:
+        raise ResponseDecodeError(str(e)) from e
+
+def dumps(obj: Any) -> str:
+    """Encodes JSON (UTF-8, compact) with the fastest available library."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    if msgspec is not None:
+        return msgspec.json.encode(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def decode_search_response(content: bytes | str, selective: bool = False) -> dict[str, Any]:
+    """
+    Decodes an srp/search response. With selective decoding each property only
+    keeps the fields in Property, the ones the final record mapping reads, and
+    msgspec skips the rest while parsing; the raw output, listing store and
+    Parquet export then lose every other field.
+    """
+    if selective and msgspec is not None:
+        try:
+            return _search_decoder.decode(content)
+        except msgspec.ValidationError:
+            # unexpected shapes fall through to the generic path below
+            pass
+        except msgspec.DecodeError as e:
+            raise ResponseDecodeError(str(e)) from e
+
+    data = loads(content)
+    if not isinstance(data, dict):
+        raise ResponseDecodeError(f"expected an object, got {type(data).__name__}")
+    if selective and isinstance(data.get("properties"), list):
+        data = {
+            "count": data.get("count"),
+            "properties": [project_fields(prop, PROPERTY_FIELDS) for prop in data["properties"]],
+        }
+    return data
+
+def decode_project_search_response(content: bytes | str) -> dict[str, Any]:
+    """Decodes a project/search response down to its two project lists."""
+    if msgspec is not None:
+        try:
+            return _project_search_decoder.decode(content)
+        except msgspec.ValidationError:
+            pass
+        except msgspec.DecodeError as e:
+            raise ResponseDecodeError(str(e)) from e
+
+    data = loads(content)
+    if not isinstance(data, dict):
+        raise ResponseDecodeError(f"expected an object, got {type(data).__name__}")
+    return {key: data[key] for key in ("newProjects", "secondaryNewProjects") if key in data}
@@ -0,0 +1,154 @@
+import os
+from collections import Counter
+from filelock import FileLock
+from typing import Any, Callable, NamedTuple
+from decoding import dumps, loads, ResponseDecodeError
+
+def listing_key(record: dict[str, Any]) -> str | None:
+    prop_id = record.get("PROP_ID")
+    return str(prop_id) if prop_id is not None else None
+
+class CityOverlap(NamedTuple):
+    first_city: str
+    city: str
+    shared: int
+    ratio: float
+
+class SeenIndex:
+    """
+    Records which city first produced each listing ID during a run.
+
+    filter() drops records another city (or an earlier page) already produced,
+    so overlapping search URLs such as chandigarh and zirakpur-chandigarh are
+    only stored and transformed once. Each ID maps to the index of its first
+    city, which is what lets overlap() attribute duplicates to a city pair; a
+    Bloom filter would be smaller but cannot say which city an ID came from.
+
+    With a path the index is loaded on creation, so a restart of a run
+    continues from it. save() merges into the file under a file lock, keeping
+    the first saved owner of each ID, so workers or shards sharing the file add
+    to it instead of overwriting each other. A running process only filters
+    against what it loaded at start, though; concurrent workers do not see each
+    other's IDs until they are restarted. Remove the file before starting a
+    fresh run, or every listing will look like a duplicate.
+    """
+
+    def __init__(self, key: Callable[[dict[str, Any]], str | None] = listing_key, path: str | None = None):
+        self.key = key
+        self.path = path
+        self.cities: list[str] = []
+        self.owners: dict[str, int] = {}
+        self.offered: Counter[str] = Counter()
+        self.dropped: Counter[str] = Counter()
+        self.shared: Counter[tuple[str, str]] = Counter()
+        if path is not None:
+            self._load()
+
+    def _city_index(self, city: str) -> int:
+        try:
+            return self.cities.index(city)
+        except ValueError:
+            self.cities.append(city)
+            return len(self.cities) - 1
+
+    def filter(self, city: str, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Returns the records whose IDs have not been seen yet in this run and marks them seen."""
+        index = self._city_index(city)
+        fresh = []
+        for record in records:
+            record_id = self.key(record)
+            if record_id is None:
+                fresh.append(record)
+                continue
+            self.offered[city] += 1
+            owner = self.owners.get(record_id)
+            if owner is None:
+                self.owners[record_id] = index
+                fresh.append(record)
+                continue
+            self.dropped[city] += 1
+            if owner != index:
+                self.shared[(self.cities[owner], city)] += 1
+        return fresh
+
+    def overlap(self) -> list[CityOverlap]:
+        """
+        Overlap per city pair, largest first. ratio is the shared share of the
+        smaller city's listings, so 1.0 means one search URL is redundant.
+        """
+        report = []
+        for (first_city, city), shared in self.shared.items():
+            smaller = min(self.offered[first_city], self.offered[city]) or 1
+            report.append(CityOverlap(first_city, city, shared, shared / smaller))
+        return sorted(report, key=lambda row: row.ratio, reverse=True)
+
+    def print_overlap(self, min_ratio: float = 0.0):
+        for row in self.overlap():
+            if row.ratio >= min_ratio:
+                print(f"{row.city} overlaps {row.first_city}: {row.shared} shared listings ({row.ratio:.0%})")
+        dropped = sum(self.dropped.values())
+        if dropped:
+            print(f"Dropped {dropped} duplicate records across {len(self.cities)} cities")
+
+    def state(self) -> dict[str, Any]:
+        """A JSON-ready copy of the index, safe to serialize while filtering goes on."""
+        return {
+            "cities": list(self.cities),
+            "owners": dict(self.owners),
+            "offered": dict(self.offered),
+            "dropped": dict(self.dropped),
+            "shared": {f"{first}|{city}": count for (first, city), count in self.shared.items()},
+        }
+
+    def restore(self, state: dict[str, Any]):
+        self.cities = list(state.get("cities", []))
+        self.owners = dict(state.get("owners", {}))
+        self.offered = Counter(state.get("offered", {}))
+        self.dropped = Counter(state.get("dropped", {}))
+        self.shared = Counter({tuple(pair.split("|", 1)): count for pair, count in state.get("shared", {}).items()})
+
+    def merge(self, state: dict[str, Any]):
+        """
+        Adds a saved state to the index. IDs keep the owner the saved state
+        gives them; counts take the larger of the two, since a restarted process
+        counts on top of what it loaded.
+        """
+        cities = state.get("cities", [])
+        for record_id, owner in state.get("owners", {}).items():
+            self.owners[record_id] = self._city_index(cities[owner])
+        for counter, saved in ((self.offered, state.get("offered", {})), (self.dropped, state.get("dropped", {}))):
+            for city, count in saved.items():
+                counter[city] = max(counter[city], count)
+        for pair, count in state.get("shared", {}).items():
+            key = tuple(pair.split("|", 1))
+            self.shared[key] = max(self.shared[key], count)
+
+    def _read(self) -> dict[str, Any] | None:
+        try:
+            with open(self.path, "rb") as f:
+                return loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ResponseDecodeError) as e:
+            print(f"Seen index at {self.path} is unreadable, starting empty: {e}")
+            return None
+
+    def _load(self):
+        state = self._read()
+        if state is not None:
+            self.restore(state)
+
+    def save(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with FileLock(f"{self.path}.lock"):
+            saved = self._read()
+            if saved is not None:
+                self.merge(saved)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(dumps(self.state()))
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,244 @@
+from typing import Any
+from mapping import Field, Compute, Equals, compile_mapping, compile_batch_mapping
+
+def bedroom_count(prop: dict[str, Any]) -> int:
+    """BEDROOM_NUM as an int; missing or non-numeric values count as 0."""
+    try:
+        return int(prop.get("BEDROOM_NUM") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def has_bedrooms(count: str) -> Equals:
+    return Equals(Field("BEDROOM_NUM", 0), count)
+
+def first_secondary_tag(prop: dict[str, Any]) -> Any:
+    tags = prop.get("SECONDARY_TAGS")
+    return tags[0] if tags else None
+
+def image_media(prop: dict[str, Any]) -> list[dict[str, Any]]:
+    return [
+        {"url": url, "type": "IMAGE", "source": None, "status": "ENABLED"}
+        for url in (prop.get("PROPERTY_IMAGES") or []) + (prop.get("THUMBNAIL_IMAGES") or [])
+    ]
+
+def point_wkt(prop: dict[str, Any]) -> str | None:
+    map_details = prop.get("MAP_DETAILS")
+    if not map_details:
+        return None
+    return f"POINT({map_details.get('LATITUDE')} {map_details.get('LONGITUDE')})"
+
+LISTING_SPEC: dict[str, Any] = {
+    "description": Field("DESCRIPTION"),
+    "status": Compute(first_secondary_tag),
+    "latitude": Field("MAP_DETAILS.LATITUDE"),
+    "longitude": Field("MAP_DETAILS.LONGITUDE"),
+    "default_image": {
+        "url": Field("PHOTO_URL"),
+        "type": "IMAGE",
+        "source": None,
+        "status": "ENABLED"
+    },
+    "media": Compute(image_media),
+    "price": {
+        "currency": None,
+        "max_price": Field("MAX_PRICE"),
+        "min_price": Field("MIN_PRICE"),
+        "sft_price": Field("PRICE_SQFT"),
+        "floor_raise": None,
+        "effective_date": None
+    },
+    "phone_numbers": None,
+    "project_type": Field("PROPERTY_TYPE"),
+    "rera_details": {
+        "rera_number": "Not Available"
+    },
+    "is_gated_community": Field("GATED"),
+    "loan_info": None,
+    "amenities": Field("xid.AMENITIES"),
+    "area": Field("SUPERBUILTUP_SQFT"),
+    "plot_venture_acres": None,
+    "faqs": None,
+    "cdata1": None,
+    "cdata2": None,
+    "created_date": {
+        "$date": {
+            "$numberLong": Field("POSTING_DATE__U")
+        }
+    },
+    "name": Field("PROP_NAME"),
+    "possession_date": None,
+    "country": "India",
+    "state": None,
+    "city_uid": None,
+    "locality_uid": None,
+    "address": Field("location.ADDRESS"),
+    "map_link": None,
+    "no_blocks": None,
+    "no_units": None,
+    "no_floors": Field("TOTAL_FLOOR"),
+    "builder_uid": None,
+    "uid": None,
+    "id": Field("PROP_ID"),
+    "domain_id": None,
+    "created_by": None,
+    "group_buy": False,
+    "open_house": None,
+    "approval_status": "UPDATE_INPROGRESS",
+    "neighbourhood_uids": None,
+    "min_price": Field("MIN_PRICE"),
+    "max_price": Field("MAX_PRICE"),
+    "plan_urls": None,
+    "brochure_urls": None,
+    "coordinates": Compute(point_wkt),
+    "rank": None,
+    "advisors": None,
+    "meta": None,
+    "alias": "alpine-place-bangalore", # This seems like a hardcoded value, keeping as is
+    "updated_date": {
+        "$date": {
+            "$numberLong": Field("UPDATE_DATE__U")
+        }
+    },
+    "updated_by": None,
+    "is_featured": False,
+    "cname_url": None,
+    "has_open_house": False,
+    "theme": None,
+    "has_1bhk": has_bedrooms('1'),
+    "has_2bhk": has_bedrooms('2'),
+    "has_3bhk": has_bedrooms('3'),
+    "has_4bhk": has_bedrooms('4'),
+    "has_5bhk": has_bedrooms('5'),
+    "has_5bhk_plus": Compute(lambda prop: bedroom_count(prop) > 5),
+    "min_area1": 0,
+    "max_area1": 0,
+    "area_duplicate": None,
+    "max_unit_area": None,
+    "min_unit_area": None,
+    "testimonials": None,
+    "default_image_mobile": None,
+    "three_d_house": None,
+    "is_trending": None,
+    "project_category": "RESIDENTIAL", # This seems like a hardcoded value, keeping as is
+    "location": {
+        "type": "Point",
+        "coordinates": [
+            Field("MAP_DETAILS.LATITUDE"),
+            Field("MAP_DETAILS.LONGITUDE"),
+        ]
+    }
+}
+
+BUILDER_SPEC: dict[str, Any] = {
+    "description": Field("description.text"),
+    "phone_numbers": [],
+    "emails": [],
+    "awards": [],
+    "achievements": [],
+    "faq": [],
+    "status": "ACTIVE",
+    "verification_status": {},
+    "builder_grade": "",
+    "builder_status": "",
+    "business_potential": "",
+    "social": None,
+    "media": None,
+    "certifications": [],
+    "offices": [
+        {
+            "source": None,
+            "address": None,
+            "city_uid": None,
+            "headoffice": False,
+            "location_uid": None
+        }
+    ],
+    "vision": None,
+    "mission": None,
+    "third_party_urls": [
+        {
+            "url": "",
+            "name": ""
+        }
+    ],
+    "created_date": {
+        "$date": {
+            "$numberLong": ""
+        }
+    },
+    "name": Field("name"),
+    "primary_email": "",
+    "website": "",
+    "total_projects": Field("projectCount.total.value"),
+    "completed_projects": Field("projectCount.tuples.0.value"),
+    "ongoing_projects": Field("projectCount.tuples.1.value"),
+    "upcoming_projects": Field("projectCount.tuples.1.value"),
+    "total_experience": None,
+    "logo": Field("coverImage.url"),
+    "id": Field("builderId"),
+    "domain_id": "",
+    "created_by": "",
+    "uid": "",
+    "testimonials": None,
+    "cdata1": {
+        "news": [
+            {
+                "url": "",
+                "date": None,
+                "title": "",
+                "description": ""
+            }
+        ],
+        "blogs": [
+            {
+                "url": "",
+                "date": None,
+                "title": "",
+                "sub_title": "",
+                "description": ""
+            }
+        ],
+        "press": [
+            {
+                "url": "",
+                "date": None,
+                "title": "",
+                "description": ""
+            }
+        ],
+        "map_url": {
+            "map_link": ""
+        }
+    },
+    "chairman_info": {
+        "title": None,
+        "message": None,
+        "image_url": None
+    },
+    "approval_status": "UPDATE_INPROGRESS",
+    "leadership": [],
+    "features": None,
+    "advisors": None,
+    "meta": None,
+    "alias": Field("name"),
+    "updated_date": {
+        "$date": {
+            "$numberLong": ""
+        }
+    },
+    "updated_by": "",
+    "cname_url": None,
+    "theme": None,
+    "is_synced": False,
+    "telephony": None,
+    "sip_phone_number": None,
+    "sales_emails": [],
+    "sales_sms_numbers": [],
+    "sales_whatsapp_numbers": [],
+    "is_client": None
+}
+
+listing_to_final_format = compile_mapping(LISTING_SPEC, "listing_to_final_format")
+listings_to_final_format = compile_batch_mapping(LISTING_SPEC, "listings_to_final_format")
+builder_to_final_format = compile_mapping(BUILDER_SPEC, "builder_to_final_format")
+builders_to_final_format = compile_batch_mapping(BUILDER_SPEC, "builders_to_final_format")
@@ -3,31 +3,69 @@ import mycdp
 import sys
 import time
 import json
+import queue
+import asyncio
+import atexit
 import base64
+import threading
+from typing import Any, NamedTuple
+from contextlib import contextmanager
 from seleniumbase import SB
 
-requests = []
+class CapturedResponse(NamedTuple):
+    url: str
+    request_id: Any
+    resource_type: str
+    mime_type: str
 
-async def receiveResponseBody(page, requests_list):
-    responses = []
-    for request in requests_list:
-        try:
-            if "https://www.99acres.com/search/property/" or "https://www.99acres.com/new-projects-in" in request[0]:
-                # print(f"Request is: {request[0]}")
-                # print(f"Fetching response body")
+class ResponseMatcher:
+    """Selects captured responses by URL prefix, CDP resource type and MIME type."""
+
+    def __init__(self, url_prefixes: tuple[str, ...] = (), resource_types: tuple[str, ...] = (), mime_types: tuple[str, ...] = ()):
+        self.url_prefixes = url_prefixes
+        self.resource_types = frozenset(resource_types)
+        self.mime_types = mime_types
 
-                res_body_data = await page.send(mycdp.network.get_response_body(request[1]))
+    def matches(self, response: CapturedResponse) -> bool:
+        if self.url_prefixes and not response.url.startswith(self.url_prefixes):
+            return False
+        if self.resource_types and response.resource_type not in self.resource_types:
+            return False
+        if self.mime_types and not response.mime_type.startswith(self.mime_types):
+            return False
+        return True
 
-                if res_body_data is None:
-                    # print(f"No response body data for {request[0]}")
-                    continue
+SEARCH_PAGE_MATCHER = ResponseMatcher(
+    url_prefixes=("https://www.99acres.com/search/property/", "https://www.99acres.com/new-projects-in"),
+    resource_types=("Document",),
+    mime_types=("text/html",),
+)
+BODY_FETCH_CONCURRENCY = 8
 
-                res_content = res_body_data[0]
+async def receiveResponseBody(page, requests_list, matcher: ResponseMatcher = SEARCH_PAGE_MATCHER, concurrency: int = BODY_FETCH_CONCURRENCY):
+    """
+    Fetches bodies of the captured responses selected by matcher, `concurrency` at a time,
+    and returns the first HTML document that carries an __apiToken, or None if none does
+    so the caller can fall back to the page source.
+    """
+    candidates = [request for request in requests_list if matcher.matches(request)]
 
-                responses.append(res_content)
+    async def fetch_body(request: CapturedResponse):
+        try:
+            res_body_data = await page.send(mycdp.network.get_response_body(request.request_id))
         except Exception as e:
-            print(f"Error getting response body for {request[0]}: {e}")
-    return responses
+            print(f"Error getting response body for {request.url}: {e}")
+            return None
+        if res_body_data is None:
+            return None
+        return res_body_data[0]
+
+    for i in range(0, len(candidates), concurrency):
+        bodies = await asyncio.gather(*[fetch_body(request) for request in candidates[i:i + concurrency]])
+        for request, body in zip(candidates[i:i + concurrency], bodies):
+            if body is not None and request.mime_type.startswith("text/html") and "__apiToken" in body:
+                return body
+    return None
 
 async def receiveCookies(page, requests_list):
     found_target_url = False
@@ -35,7 +73,7 @@ async def receiveCookies(page, requests_list):
 
     print(f"Attempting to fetch cookies")
 
-    for request_url, _ in requests_list:
+    for request_url, *_ in requests_list:
         if "https://www.99acres.com/api-aggregator/auth/doStaticPageLogin" in request_url and not found_target_url:
             try:
                 cookies_data = await page.send(mycdp.network.get_cookies(urls=[request_url]))
@@ -59,42 +97,216 @@ async def receiveCookies(page, requests_list):
 
     return cookies_result
 
-def extract_cookies_99acres(url, proxy):
-    # with SB(uc=True, test=True, locale="en", headless2=False, proxy=proxy) as sb:
-    with SB(uc=True, test=True, locale="en", headless2=False) as sb:
-        sb.activate_cdp_mode("about:blank")
-        page = sb.cdp.page
+class BrowserSession:
+    """A long-lived CDP-mode browser that records every response it receives."""
+
+    def __init__(self, proxy: str | None = None):
+        self._context = SB(uc=True, test=True, locale="en", headless2=False, proxy=proxy)
+        self.sb = self._context.__enter__()
+        self.sb.activate_cdp_mode("about:blank")
+        self.page = self.sb.cdp.page
+        self.loop = self.sb.cdp.get_event_loop()
+        self.requests: list[CapturedResponse] = []
+        self.uses = 0
 
         async def handler(evt):
-            requests.append([evt.response.url, evt.request_id])
+            self.requests.append(CapturedResponse(evt.response.url, evt.request_id, evt.type_.value if evt.type_ else "", evt.response.mime_type or ""))
+
+        self.loop.run_until_complete(self.page.send(mycdp.network.enable()))
+        self.page.add_handler(mycdp.network.ResponseReceived, handler)
+
+    def reset(self):
+        """Clears captured responses and cookies so the next page logs in afresh."""
+        self.requests.clear()
+        self.loop.run_until_complete(self.page.send(mycdp.network.clear_browser_cookies()))
+
+    def close(self):
+        try:
+            self._context.__exit__(None, None, None)
+        except Exception as e:
+            print(f"Error closing browser session: {e}")
+
+class BrowserPool:
+    """
+    Pool of warm browser sessions checked out one caller at a time.
+    Sessions are launched lazily up to `size` and relaunched after `max_uses` checkouts.
+    """
+
+    def __init__(self, size: int = 2, max_uses: int = 20, proxy: str | None = None):
+        self.size = size
+        self.max_uses = max_uses
+        self.proxy = proxy
+        self._idle: queue.Queue[BrowserSession] = queue.Queue()
+        self._launched = 0
+        self._lock = threading.Lock()
+        self._sessions: list[BrowserSession] = []
+
+    def _acquire(self) -> BrowserSession:
+        wait = 0.0
+        while True:
+            try:
+                return self._idle.get(timeout=wait) if wait else self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                if self._launched < self.size:
+                    self._launched += 1
+                    break
+            wait = 1.0
+        try:
+            session = BrowserSession(self.proxy)
+        except Exception:
+            with self._lock:
+                self._launched -= 1
+            raise
+        with self._lock:
+            self._sessions.append(session)
+        return session
+
+    def _discard(self, session: BrowserSession):
+        session.close()
+        with self._lock:
+            self._launched -= 1
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    @contextmanager
+    def checkout(self):
+        session = self._acquire()
+        healthy = False
+        try:
+            session.reset()
+            session.uses += 1
+            yield session
+            healthy = True
+        finally:
+            if healthy and session.uses < self.max_uses:
+                self._idle.put(session)
+            else:
+                self._discard(session)
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+            self._launched = 0
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for session in sessions:
+            session.close()
 
-        loop = sb.cdp.get_event_loop()
+_pools: dict[str | None, BrowserPool] = {}
+_pools_lock = threading.Lock()
+
+def get_browser_pool(proxy: str | None = None, size: int = 2, max_uses: int = 20) -> BrowserPool:
+    """Returns the shared pool for a proxy, creating it on first use."""
+    with _pools_lock:
+        if proxy not in _pools:
+            _pools[proxy] = BrowserPool(size, max_uses, proxy)
+        return _pools[proxy]
+
+@atexit.register
+def close_browser_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+LOGIN_URL = "https://www.99acres.com/api-aggregator/auth/doStaticPageLogin"
+READY_TIMEOUT = 60.0
+SCROLL_AFTER = 10.0
+SCROLL_INTERVAL = 2.0
+POLL_INTERVAL = 0.25
+
+READY_JS = """JSON.stringify({
+    api_token: !!(document.getElementById("__apiToken") || document.querySelector('[name="__apiToken"]')),
+    encrypted_input: Array.from(document.scripts).some(s => s.text.includes('"encrypted_input":"'))
+})"""
+
+class PhaseTimer:
+    """Records when each phase of a token acquisition finished, relative to the start."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.phases: dict[str, float] = {}
+
+    def mark(self, phase: str):
+        self.phases[phase] = time.monotonic() - self.start
+
+    def summary(self) -> str:
+        return ", ".join(f"{phase}={elapsed:.2f}s" for phase, elapsed in self.phases.items())
+
+def wait_for_signals(session: BrowserSession, timer: PhaseTimer, timeout: float = READY_TIMEOUT, scroll_after: float = SCROLL_AFTER) -> set[str]:
+    """
+    Polls until the login response, the __apiToken input and the encrypted_input blob
+    have all appeared, scrolling periodically once scroll_after has passed.
+    Returns the signals still missing when the hard timeout was reached.
+    """
+    pending = {"login_response", "api_token", "encrypted_input"}
+    deadline = time.monotonic() + timeout
+    scroll_from = time.monotonic() + scroll_after
+    next_scroll = scroll_from
+
+    while pending and time.monotonic() < deadline:
+        if "login_response" in pending and any(LOGIN_URL in request.url for request in session.requests):
+            pending.discard("login_response")
+            timer.mark("login_response")
+
+        if pending & {"api_token", "encrypted_input"}:
+            try:
+                state = json.loads(session.sb.cdp.evaluate(READY_JS))
+            except Exception:
+                state = {}
+            for signal in ("api_token", "encrypted_input"):
+                if signal in pending and state.get(signal):
+                    pending.discard(signal)
+                    timer.mark(signal)
+
+        now = time.monotonic()
+        if pending and now >= next_scroll:
+            if next_scroll == scroll_from:
+                print(f"Signals still pending after {scroll_after:.0f}s, scrolling: {sorted(pending)}")
+            session.sb.cdp.scroll_down(300)
+            next_scroll = now + SCROLL_INTERVAL
+
+        if pending:
+            time.sleep(POLL_INTERVAL)
+
+    if pending:
+        print(f"Timed out after {timeout:.0f}s waiting for: {sorted(pending)}")
+    return pending
+
+def extract_cookies_99acres(url, proxy=None, pool: BrowserPool | None = None, timings: dict[str, float] | None = None):
+    timer = PhaseTimer()
+    pool = pool or get_browser_pool(proxy or None)
+    with pool.checkout() as session:
+        timer.mark("checkout")
+        sb = session.sb
+        page = session.page
+        loop = session.loop
+        requests = session.requests
 
-        loop.run_until_complete(page.send(mycdp.network.enable()))
-        page.add_handler(mycdp.network.ResponseReceived, handler)
         target_url = url
         print(f"Opening URL: {target_url}")
         sb.cdp.open(target_url)
-        time.sleep(30)
+        timer.mark("navigate")
 
-        print(f"Scrolling down to trigger more XHRs...")
-        for i in range(5):
-            sb.cdp.scroll_down(300)
-            time.sleep(5)
+        wait_for_signals(session, timer)
 
-        time.sleep(2)
-
-        print(f"Processing captured XHR responses (fetching bodies)...")
-        responses = loop.run_until_complete(receiveResponseBody(page, requests))
-        print(f"Total {len(responses)} XHR response bodies processed.")
-        if len(responses) == 0:
-            responses.append(sb.cdp.get_page_source())
+        print(f"Processing captured search page responses (fetching bodies)...")
+        html_content = loop.run_until_complete(receiveResponseBody(page, requests))
+        if html_content is None:
+            print(f"No captured response carries the __apiToken, reading the page source")
+            html_content = sb.cdp.get_page_source()
+        timer.mark("response_bodies")
 
         print(f"Fetching cookies for the first matching request URL...")
         cookies = loop.run_until_complete(receiveCookies(page, requests)) 
         cookie_dict = {cookie.name: cookie.value for cookie in cookies}
-        print("Cookies formatted for curl_cffi:")
-
-        print(f"Script finished.")
-        return responses[0], cookie_dict
+        timer.mark("cookies")
 
+        print(f"Token acquisition timings: {timer.summary()}")
+        if timings is not None:
+            timings.update(timer.phases)
+        return html_content, cookie_dict
@@ -0,0 +1,93 @@
+from typing import Any, Callable
+from coerce import as_int
+
+# srp/search sort order that should list the most recently posted or updated
+# listings first; IncrementalFilter checks the pages really come in that order
+NEWEST_FIRST = "date_d"
+STALE_PAGES_TO_STOP = 2
+DATE_FIELDS = ("UPDATE_DATE__U", "POSTING_DATE__U")
+
+class IncrementalFilter:
+    """
+    Splits newest-first search pages into fresh and already-known listings.
+
+    A listing is fresh when its PROP_ID is not in `known` or its UPDATE_DATE__U
+    differs from the stored one. Because pages are sorted newest first, once
+    `stop_after` consecutive pages bring nothing fresh every later page is
+    older still, and should_stop() tells the crawl to stop planning pages.
+
+    That only holds if the API honours the sort order, so every page is checked:
+    at least one of DATE_FIELDS has to be non-increasing within each page and
+    from each page to the next. Once neither is, should_stop() never fires and
+    the crawl fetches every page.
+    """
+
+    def __init__(self, known: dict[str, int | None], stop_after: int = STALE_PAGES_TO_STOP):
+        self.known = known
+        self.stop_after = stop_after
+        self.stale_pages: set[int] = set()
+        self.fresh_count = 0
+        self.ordered_fields = set(DATE_FIELDS)
+        # {page: {field: (first date, last date)}}
+        self.page_dates: dict[int, dict[str, tuple[int, int]]] = {}
+
+    def _check_order(self, page: int, props: list[dict[str, Any]]):
+        bounds = {}
+        for field in list(self.ordered_fields):
+            dates = [date for date in (as_int(prop.get(field)) for prop in props) if date is not None]
+            # a field the listings do not carry proves nothing about the order
+            if (props and not dates) or any(newer > older for older, newer in zip(dates, dates[1:])):
+                self.ordered_fields.discard(field)
+            elif dates:
+                bounds[field] = (dates[0], dates[-1])
+        self.page_dates[page] = bounds
+        # pages finish out of order, so compare with whichever neighbours are already in
+        for before, after in ((page - 1, page), (page, page + 1)):
+            for field in list(self.ordered_fields):
+                last = self.page_dates.get(before, {}).get(field)
+                first = self.page_dates.get(after, {}).get(field)
+                if last is not None and first is not None and first[0] > last[1]:
+                    self.ordered_fields.discard(field)
+        if not self.ordered_fields:
+            print(f"Page {page} is not sorted newest first; the incremental crawl will not stop early")
+
+    def split(
+        self,
+        page: int,
+        props: list[dict[str, Any]],
+        keep: Callable[[dict[str, Any]], bool] | None = None
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """
+        Returns (fresh, unchanged) listings of a page and records whether the
+        page was stale. The sort order is checked on the whole page; `keep`
+        selects the listings the crawl stores, and a page none of them is on
+        proves nothing about later pages, so it is never counted as stale.
+        """
+        if self.ordered_fields:
+            self._check_order(page, props)
+        if keep is not None:
+            props = [prop for prop in props if keep(prop)]
+        fresh, unchanged = [], []
+        for prop in props:
+            prop_id = str(prop.get("PROP_ID"))
+            update_date = as_int(prop.get("UPDATE_DATE__U"))
+            if prop_id in self.known and self.known[prop_id] == update_date:
+                unchanged.append(prop)
+            else:
+                # later pages can repeat a listing that moved up while paging
+                self.known[prop_id] = update_date
+                fresh.append(prop)
+        if props and not fresh:
+            self.stale_pages.add(page)
+        self.fresh_count += len(fresh)
+        return fresh, unchanged
+
+    def should_stop(self) -> bool:
+        """True once some run of stop_after consecutive pages has been stale, as long as the pages are sorted."""
+        if not self.ordered_fields:
+            return False
+        # pages finish out of order, so look for any complete run rather than a running streak
+        return any(
+            all(page + offset in self.stale_pages for offset in range(1, self.stop_after))
+            for page in self.stale_pages
+        )
@@ -0,0 +1,390 @@
+import os
+import time
+import asyncio
+import argparse
+from typing import Any, Callable, NamedTuple
+from functools import partial
+from curl_cffi import AsyncSession
+from curl_cffi.requests.models import Response
+from rate_limit import AdaptiveLimiter
+from proxy_pool import ProxyPool, add_proxy_args, open_proxy_pool
+from urllib.parse import urlencode
+from credentials import CityCredentials, CredentialsPool
+from retry import FetchFailure, AUTH_EXPIRED, TRANSIENT, check_response, retries, add_retry_args
+from runner import run_cities, run_queue_workers, add_runner_args, MAX_ACTIVE_CITIES
+from pipeline import crawl_pages, plan_last_page, PageProgress, PAGE_SIZE, IN_FLIGHT_PAGES
+from sink import OutputSinks, open_output_sinks, OUTPUT_DIR
+from work_queue import WorkQueue, WorkItem, add_queue_args, worker_output_dir
+from checkpoint import Checkpoint, add_checkpoint_args, checkpoint_name
+from listing_store import ListingStore, read_city_counts
+from dedup import SeenIndex, listing_key
+from incremental import IncrementalFilter, NEWEST_FIRST, STALE_PAGES_TO_STOP
+from final_formats import listing_to_final_format
+from decoding import decode_search_response
+from catalog import CatalogCity, add_catalog_args, select_cities, search_url
+import transport
+from transport import Endpoint, SRP_SEARCH, add_transport_args, transport_config, open_session, request_timings
+
+def is_resale(prop: dict[str, Any]) -> bool:
+    return "RESALE" in (prop.get("SECONDARY_TAGS") or [])
+
+class SearchProfile(NamedTuple):
+    """
+    How one kind of srp/search (rent, buy) is requested, decoded and filtered.
+    A selective profile only decodes the fields the final format reads.
+    """
+    mode: str
+    label: str
+    max_pages: int
+    endpoint: Endpoint = SRP_SEARCH
+    keep: Callable[[dict[str, Any]], bool] | None = None
+    selective: bool = False
+
+# the rent search has always been fetched with the chrome110 fingerprint
+RENT_PROFILE = SearchProfile("rent", "rental", max_pages=5, endpoint=SRP_SEARCH._replace(impersonate="chrome110"))
+BUY_PROFILE = SearchProfile("buy", "resale", max_pages=10, keep=is_resale)
+PROFILES = {profile.mode: profile for profile in (RENT_PROFILE, BUY_PROFILE)}
+
+class CitySearch(NamedTuple):
+    """The search URLs of one city, keyed by profile mode."""
+    city: str
+    city_id: str
+    urls: dict[str, str]
+
+def catalog_searches(cities: list[CatalogCity], profiles: list[SearchProfile]) -> list[CitySearch]:
+    """Builds each catalog city's search URLs for the given profiles."""
+    return [
+        CitySearch(city.slug, city.city_id, {profile.mode: search_url(city, profile.mode) for profile in profiles})
+        for city in cities
+    ]
+
+async def fetch_page_data(
+    session: AsyncSession,
+    page: int,
+    city_id: str,
+    credentials: CityCredentials,
+    search_url: str,
+    limiter: AdaptiveLimiter,
+    profile: SearchProfile,
+    sort_by: str | None = None
+) -> Response:
+    """
+    Fetches one page of a search, respecting the rate limit, through the proxy
+    the city's credentials were acquired with. A response that did not succeed
+    raises its FetchFailure; retrying is up to the caller. The profile's
+    encrypted_input is looked up per call, so a credential refresh replaces it too.
+    sort_by selects the srp/search sort order, e.g. NEWEST_FIRST for incremental crawls.
+    """
+    creds = credentials.current
+    if creds is None:
+        raise FetchFailure(AUTH_EXPIRED, "no credentials available")
+    encrypted_input = await credentials.encrypted_input_for(session, search_url, limiter)
+    if not encrypted_input:
+        raise FetchFailure(AUTH_EXPIRED, "no encrypted_input available")
+
+    async with limiter[profile.endpoint.name] as rate:
+        params = {
+            'page': str(page), 'page_size': str(PAGE_SIZE),
+            'platform': 'DESKTOP', 'encrypted_input': encrypted_input,
+            'recomGroupType': 'VSP', 'pageName': 'SRP', 'search_type': 'QS',
+            'groupByConfigurations': 'true', 'origPageContext': {"searchScope":"","locationId":""},
+            'lazy': 'true', 'isBottomNavFlow': 'false',
+        }
+        if sort_by:
+            params['sortby'] = sort_by
+
+        api_url = "https://www.99acres.com/api-aggregator/srp/search?" + urlencode(params)
+
+        headers = {'apitoken': creds.signer.sign(api_url), 'authorizationtoken': creds.auth_token, 'referer': search_url}
+
+        response = await transport.get(session, profile.endpoint, api_url, headers, rate, credentials.egress, cookies=creds.cookies)
+        print(f"City: {city_id}, {profile.mode} page: {page}, Status: {response.status_code} http_version: {response.http_version}")
+
+    check_response(profile.endpoint, response)
+    return response
+
+async def fetch_search_page(
+    session: AsyncSession,
+    search: CitySearch,
+    profile: SearchProfile,
+    credentials: CityCredentials,
+    limiter: AdaptiveLimiter,
+    page: int,
+    sort_by: str | None = None
+) -> dict[str, Any] | None:
+    """
+    Fetches and decodes one search page, retried by the retry engine according
+    to how it fails; returns None once the engine gave up on it.
+    """
+
+    async def attempt() -> dict[str, Any]:
+        response = await fetch_page_data(session, page, search.city_id, credentials, search.urls[profile.mode], limiter, profile, sort_by)
+        data = decode_search_response(response.content, profile.selective)
+        if "properties" not in data:
+            # the body as received, not what selective decoding kept of it
+            with open("response_data_error.json", "wb") as f:
+                f.write(response.content)
+            raise FetchFailure(TRANSIENT, "no properties in the response")
+        return data
+
+    try:
+        return await retries.run(search.city, f"{profile.mode} page {page}", attempt, credentials)
+    except FetchFailure:
+        return None
+
+def profile_listings(profile: SearchProfile, data: dict[str, Any]) -> list[dict[str, Any]]:
+    props = data["properties"]
+    if profile.keep is not None:
+        props = [prop for prop in props if profile.keep(prop)]
+    return props
+
+async def crawl_profile(
+    session: AsyncSession,
+    search: CitySearch,
+    profile: SearchProfile,
+    credentials: CityCredentials,
+    limiter: AdaptiveLimiter,
+    results: OutputSinks,
+    incremental: bool = False,
+    stop_after: int = STALE_PAGES_TO_STOP,
+    progress: PageProgress | None = None
+):
+    """
+    Pages through one profile's search results for a city using the city's shared
+    credentials. Pages already recorded in `progress` are not fetched again.
+    """
+    city_name = search.city
+    search_url = search.urls[profile.mode]
+    if not await credentials.encrypted_input_for(session, search_url, limiter):
+        print(f"Could not get the {profile.mode} encrypted_input for {city_name}. Skipping.")
+        return
+
+    tracker = None
+    if incremental:
+        if results.store is None:
+            raise ValueError("incremental crawls need a listing store to compare against")
+        known = await asyncio.to_thread(results.store.store.known_listings, profile.mode)
+        print(f"Incremental {profile.mode} crawl of {city_name}: {len(known)} {profile.mode} listings already stored")
+        tracker = IncrementalFilter(known, stop_after)
+
+    async def fetch_page(page: int) -> dict[str, Any] | None:
+        return await fetch_search_page(session, search, profile, credentials, limiter, page, NEWEST_FIRST if incremental else None)
+
+    def handle_page(page: int, data: dict[str, Any]) -> bool:
+        if tracker is None:
+            props = profile_listings(profile, data)
+        else:
+            # the order check needs the whole page, not just the listings the profile keeps
+            props, unchanged = tracker.split(page, data["properties"], profile.keep)
+            # unchanged listings only refresh their last-seen time in the store
+            results.store.write(city_name, unchanged)
+        results.write(city_name, props)
+        print(f"total {profile.label} properties found for {city_name}: {results.raw.counts.get(city_name, 0)}")
+        return tracker is not None and tracker.should_stop()
+
+    crawl = await crawl_pages(fetch_page, handle_page, PAGE_SIZE, IN_FLIGHT_PAGES, profile.max_pages, progress=progress)
+    if crawl.failed_pages:
+        print(f"{profile.mode} pages failed for {city_name}: {crawl.failed_pages}")
+    if tracker is not None:
+        print(f"Incremental {profile.mode} crawl of {city_name} fetched {crawl.fetched_pages} of {crawl.planned_pages} pages, {tracker.fresh_count} new or updated")
+
+async def process_city(
+    session: AsyncSession,
+    search: CitySearch,
+    proxies: ProxyPool,
+    results: dict[str, OutputSinks],
+    profiles: list[SearchProfile] | None = None,
+    incremental: bool = False,
+    stop_after: int = STALE_PAGES_TO_STOP,
+    checkpoint: Checkpoint | None = None
+):
+    """
+    Crawls every profile of a city concurrently under one credential set. The
+    credentials come from the first profile's search page; the other profiles
+    only need their own encrypted_input. The whole city goes through one proxy
+    of the pool, with that proxy's limiter. Profiles the checkpoint holds as
+    complete are skipped.
+    """
+    profiles = [profile for profile in profiles or PROFILES.values() if profile.mode in search.urls]
+    if not profiles:
+        print(f"No search URL for the selected profiles in {search.city}. Skipping.")
+        return
+    primary_url = search.urls[profiles[0].mode]
+    if checkpoint is not None:
+        profiles = [profile for profile in profiles if not checkpoint.search(profile.mode, search.city).complete]
+        if not profiles:
+            print(f"{search.city} is complete in the checkpoint. Skipping.")
+            return
+
+    with proxies.lease() as egress:
+        async with CityCredentials(primary_url, search.city, egress) as credentials:
+            if credentials.current is None:
+                print(f"Could not get initial tokens for {search.city}. Skipping.")
+                return
+            outcomes = await asyncio.gather(*(
+                crawl_profile(
+                    session, search, profile, credentials, egress.limiter, results[profile.mode], incremental, stop_after,
+                    checkpoint.search(profile.mode, search.city) if checkpoint is not None else None
+                )
+                for profile in profiles
+            ), return_exceptions=True)
+
+    failed = [(profile, outcome) for profile, outcome in zip(profiles, outcomes) if isinstance(outcome, Exception)]
+    for profile, error in failed:
+        print(f"{profile.mode} crawl of {search.city} failed: {error}")
+    if failed and len(failed) == len(profiles):
+        raise failed[0][1]
+
+async def work_listing_queue(
+    session: AsyncSession,
+    queue: WorkQueue,
+    worker_id: str,
+    searches: list[CitySearch],
+    profiles: list[SearchProfile],
+    proxies: ProxyPool,
+    results: dict[str, OutputSinks],
+    max_active: int = MAX_ACTIVE_CITIES
+) -> dict[str, int]:
+    """
+    Seeds page 1 of every city and profile into the shared queue, then works
+    through it alongside any other workers. Finishing a page 1 queues the rest
+    of that search's pages. Every worker of one queue should be started with the
+    same cities and profiles, since items are looked up in this worker's selection.
+    """
+    by_city = {search.city: search for search in searches}
+    by_mode = {profile.mode: profile for profile in profiles}
+    seeded = 0
+    for search in searches:
+        for profile in profiles:
+            if profile.mode in search.urls:
+                seeded += await asyncio.to_thread(queue.enqueue, "listing", search.city, [1], profile.mode)
+    print(f"Worker {worker_id} seeded {seeded} new searches into {queue.path}")
+    pool = CredentialsPool(max_active, proxies)
+
+    async def handle_item(item: WorkItem) -> dict[str, Any]:
+        search, profile = by_city.get(item.city), by_mode.get(item.mode)
+        if search is None or profile is None:
+            raise LookupError(f"{item.mode} search of {item.city} is not in this worker's selection")
+        primary = next(p for p in profiles if p.mode in search.urls)
+        credentials = await pool.get(search.urls[primary.mode], search.city)
+        if credentials.current is None:
+            raise RuntimeError(f"could not get tokens for {search.city}")
+        data = await fetch_search_page(session, search, profile, credentials, credentials.egress.limiter, item.page)
+        if data is None:
+            raise RuntimeError("no usable response")
+        props = profile_listings(profile, data)
+        results[profile.mode].write(search.city, props)
+        if item.page == 1:
+            last_page = plan_last_page(int(data.get("count") or 0), PAGE_SIZE, profile.max_pages)
+            added = await asyncio.to_thread(queue.enqueue, "listing", search.city, range(2, last_page + 1), profile.mode)
+            print(f"Planned {last_page} {profile.mode} pages for {search.city}, {added} newly queued")
+        return {"properties": len(props)}
+
+    try:
+        stats = await run_queue_workers(queue, worker_id, ["listing"], handle_item, IN_FLIGHT_PAGES * max_active)
+    finally:
+        await pool.close()
+    print(f"Worker {worker_id} finished {stats['done']} pages ({stats['failed']} failed attempts); queue: {queue.summary()}")
+    return stats
+
+def open_profile_sinks(
+    profiles: list[SearchProfile],
+    store: ListingStore,
+    seen_dir: str | None = None,
+    directory: str = OUTPUT_DIR
+) -> dict[str, OutputSinks]:
+    """Opens the output sinks of each profile, each with its own cross-city duplicate index."""
+    return {
+        profile.mode: open_output_sinks(
+            profile.mode, listing_to_final_format, directory, store=store,
+            seen=SeenIndex(listing_key, os.path.join(seen_dir, f"seen-{profile.mode}.json") if seen_dir else None),
+        )
+        for profile in profiles
+    }
+
+def parse_args(description: str = "Scrape rental and resale listings from 99acres.", profiles: bool = True) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    if profiles:
+        parser.add_argument("--profile", dest="profiles", action="append", choices=sorted(PROFILES), help="search profile to crawl (repeatable, default: all)")
+    parser.add_argument("--incremental", action="store_true", help="fetch newest listings first and stop once pages bring nothing new")
+    parser.add_argument("--stop-after", type=int, default=STALE_PAGES_TO_STOP, help="consecutive pages without new listings before an incremental crawl stops")
+    parser.add_argument("--seen-index", help="directory that keeps the cross-city duplicate indexes between restarts of one run")
+    parser.add_argument("--selective-decoding", action="store_true", help="decode only the listing fields the final format needs; raw output, store and Parquet lose the rest")
+    add_catalog_args(parser)
+    add_queue_args(parser)
+    add_checkpoint_args(parser)
+    add_transport_args(parser)
+    add_proxy_args(parser)
+    add_retry_args(parser)
+    add_runner_args(parser)
+    args = parser.parse_args()
+    if args.queue and args.incremental:
+        parser.error("--incremental stops on page order and cannot be combined with --queue")
+    if args.queue and args.resume:
+        parser.error("the work queue keeps its own progress; run the worker again without --resume")
+    return args
+
+async def crawl_listings(searches: list[CitySearch], profiles: list[SearchProfile], args: argparse.Namespace):
+    """Crawls the given cities for every profile with one shared session, proxy pool and store."""
+    if args.selective_decoding:
+        profiles = [profile._replace(selective=True) for profile in profiles]
+    store = ListingStore()
+    queue = WorkQueue(args.queue) if args.queue else None
+    # queue workers share the store but each writes its own files
+    directory = worker_output_dir(args.worker_id) if queue else OUTPUT_DIR
+    results = open_profile_sinks(profiles, store, args.seen_index, directory)
+    proxies = open_proxy_pool(args)
+    retries.city_budget = args.retry_budget
+    checkpoint = None
+    if queue is None:
+        name = checkpoint_name(args, "listings-" + "-".join(profile.mode for profile in profiles))
+        checkpoint = Checkpoint(name, resume=args.resume, interval=args.checkpoint_interval)
+        for mode, sinks in results.items():
+            checkpoint.track(mode, sinks)
+    city_task = partial(process_city, profiles=profiles, incremental=args.incremental, stop_after=args.stop_after, checkpoint=checkpoint)
+
+    try:
+        async with open_session(transport_config(args)) as session:
+            if queue is None:
+                checkpoint.start()
+                await run_cities(session, searches, city_task, proxies, results, args.max_active_cities)
+            else:
+                await work_listing_queue(session, queue, args.worker_id, searches, profiles, proxies, results, args.max_active_cities)
+    finally:
+        if checkpoint is not None:
+            await checkpoint.close()
+        await asyncio.gather(*(sinks.close() for sinks in results.values()))
+        store.close()
+        if queue is not None:
+            queue.close()
+        for sinks in results.values():
+            sinks.seen.save()
+
+    for profile in profiles:
+        sinks = results[profile.mode]
+        for city_name, count in sinks.raw.counts.items():
+            print(f"{profile.label} props in {city_name}: {count}")
+        for city_name, changed in sinks.store.changed.items():
+            print(f"new or updated {profile.label} props in {city_name}: {changed}")
+        sinks.seen.print_overlap()
+        print(f"{profile.label} data saved to {sinks.raw.directory} and {sinks.final.directory}")
+        if sinks.columnar is not None:
+            print(f"Parquet export written under {sinks.columnar.directory}")
+    request_timings.print_summary()
+    proxies.print_health()
+    retries.print_summary()
+    print(f"\nScraping complete. Listing store updated at {store.path}")
+
+async def main(args: argparse.Namespace):
+    profiles = [PROFILES[mode] for mode in args.profiles or PROFILES]
+    cities = select_cities(args, read_city_counts)
+    await crawl_listings(catalog_searches(cities, profiles), profiles, args)
+
+if __name__ == "__main__":
+    start_time = time.time()
+    try:
+        asyncio.run(main(parse_args()))
+    except KeyboardInterrupt:
+        print("\nProcess interrupted by user. Exiting cleanly...")
+    end_time = time.time()
+    print(f"Total execution time: {end_time - start_time:.2f} seconds")
@@ -0,0 +1,231 @@
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from typing import Any, Iterable
+from decoding import dumps
+from coerce import as_float, as_int
+
+STORE_PATH = os.path.join("output", "listings.db")
+BUSY_TIMEOUT_MS = 30_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    prop_id     TEXT PRIMARY KEY,
+    mode        TEXT NOT NULL,
+    city        TEXT NOT NULL,
+    name        TEXT,
+    price       REAL,
+    max_price   REAL,
+    bedrooms    INTEGER,
+    update_date INTEGER,
+    first_seen  REAL NOT NULL,
+    last_seen   REAL NOT NULL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listings_city ON listings (city, mode);
+CREATE INDEX IF NOT EXISTS listings_price ON listings (price);
+CREATE INDEX IF NOT EXISTS listings_bedrooms ON listings (bedrooms);
+
+CREATE TABLE IF NOT EXISTS builders (
+    builder_id     TEXT PRIMARY KEY,
+    city           TEXT NOT NULL,
+    name           TEXT,
+    total_projects INTEGER,
+    first_seen     REAL NOT NULL,
+    last_seen      REAL NOT NULL,
+    data           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS builders_city ON builders (city);
+"""
+
+UPSERT_LISTING = """
+INSERT INTO listings (prop_id, mode, city, name, price, max_price, bedrooms, update_date, first_seen, last_seen, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (prop_id) DO UPDATE SET
+    mode = excluded.mode, name = excluded.name,
+    price = excluded.price, max_price = excluded.max_price, bedrooms = excluded.bedrooms,
+    update_date = excluded.update_date, last_seen = excluded.last_seen, data = excluded.data
+"""
+
+UPSERT_BUILDER = """
+INSERT INTO builders (builder_id, city, name, total_projects, first_seen, last_seen, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (builder_id) DO UPDATE SET
+    name = excluded.name, total_projects = excluded.total_projects,
+    last_seen = excluded.last_seen, data = excluded.data
+"""
+
+class ListingStore:
+    """
+    SQLite store of every listing and builder seen, keyed on PROP_ID and builderId.
+
+    The database runs in WAL mode so readers and other scraper processes are
+    not blocked by a crawl; each upsert call is one transaction. Rows keep the
+    time they were first and last seen and the listing's UPDATE_DATE__U, so
+    later runs can tell new and changed listings from ones already stored.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # one connection shared by the sink threads, serialized by the lock
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+
+    def _stored_versions(self, table: str, key: str, version: str, ids: list[str]) -> dict[str, Any]:
+        stored = {}
+        # stay well below SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            stored.update(self.connection.execute(
+                f"SELECT {key}, {version} FROM {table} WHERE {key} IN ({placeholders})", chunk
+            ))
+        return stored
+
+    def _upsert(self, table: str, key: str, version: str, sql: str, rows: list[tuple], version_index: int) -> int:
+        """
+        Runs one batched upsert and returns how many rows were new or carried a
+        different `version` column value than the stored row.
+        """
+        if not rows:
+            return 0
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._stored_versions(table, key, version, [row[0] for row in rows])
+                self.connection.executemany(sql, rows)
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        return sum(1 for row in rows if row[0] not in stored or stored[row[0]] != row[version_index])
+
+    def upsert_listings(self, city: str, mode: str, props: Iterable[dict[str, Any]], seen_at: float | None = None) -> int:
+        """Stores one page of srp/search properties; returns the number of new or updated listings."""
+        seen_at = seen_at or time.time()
+        rows = [
+            (
+                str(prop["PROP_ID"]), mode, city, prop.get("PROP_NAME"),
+                as_float(prop.get("MIN_PRICE")), as_float(prop.get("MAX_PRICE")),
+                as_int(prop.get("BEDROOM_NUM")), as_int(prop.get("UPDATE_DATE__U")),
+                seen_at, seen_at, dumps(prop),
+            )
+            for prop in props if prop.get("PROP_ID") is not None
+        ]
+        return self._upsert("listings", "prop_id", "update_date", UPSERT_LISTING, rows, 7)
+
+    def upsert_builders(self, city: str, builders: Iterable[dict[str, Any]], seen_at: float | None = None) -> int:
+        """Stores builders with their scraped projects; returns the number of new builders or ones with a changed project count."""
+        seen_at = seen_at or time.time()
+        rows = []
+        for builder in builders:
+            if builder.get("builderId") is None:
+                continue
+            total = (builder.get("projectCount") or {}).get("total") or {}
+            rows.append((
+                str(builder["builderId"]), city, builder.get("name"),
+                as_int(total.get("value") if isinstance(total, dict) else None),
+                seen_at, seen_at, dumps(builder),
+            ))
+        return self._upsert("builders", "builder_id", "total_projects", UPSERT_BUILDER, rows, 3)
+
+    def known_listings(self, mode: str) -> dict[str, int | None]:
+        """
+        Returns {PROP_ID: UPDATE_DATE__U} for every stored listing of a mode, of
+        any city: overlapping cities (e.g. delhi-ncr and gurgaon) list the same
+        properties, which are stored under the first city that found them.
+        """
+        with self.lock:
+            return dict(self.connection.execute("SELECT prop_id, update_date FROM listings WHERE mode = ?", (mode,)))
+
+    def listing_counts(self, mode: str | None = None) -> dict[str, int]:
+        """Returns the number of stored listings per city, optionally for one mode."""
+        with self.lock:
+            if mode is None:
+                rows = self.connection.execute("SELECT city, COUNT(*) FROM listings GROUP BY city")
+            else:
+                rows = self.connection.execute("SELECT city, COUNT(*) FROM listings WHERE mode = ? GROUP BY city", (mode,))
+            return dict(rows)
+
+    def builder_counts(self) -> dict[str, int]:
+        """Returns the number of stored builders per city."""
+        with self.lock:
+            return dict(self.connection.execute("SELECT city, COUNT(*) FROM builders GROUP BY city"))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+def read_city_counts(path: str = STORE_PATH, builders: bool = False) -> dict[str, int]:
+    """Per-city listing (or builder) counts of a store file, without creating one that is missing."""
+    if not os.path.exists(path):
+        print(f"No listing store at {path}, using unweighted counts")
+        return {}
+    store = ListingStore(path)
+    try:
+        return store.builder_counts() if builders else store.listing_counts()
+    finally:
+        store.close()
+
+class StoreSink:
+    """
+    Writes each page handed to write() into the listing store as one transaction.
+
+    Transactions run in a background thread, in order per city, like the NDJSON
+    sinks; `changed` counts the new or updated rows per city.
+    """
+
+    def __init__(self, store: ListingStore, mode: str):
+        self.store = store
+        self.mode = mode
+        self.changed: dict[str, int] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def _upsert(self, city: str, records: list[dict[str, Any]]) -> int:
+        if self.mode == "builders":
+            return self.store.upsert_builders(city, records)
+        return self.store.upsert_listings(city, self.mode, records)
+
+    def write(self, city: str, records: list[dict[str, Any]]):
+        if not records:
+            return
+        previous = self._pending.get(city)
+
+        async def upsert():
+            if previous is not None:
+                await previous
+            try:
+                changed = await asyncio.to_thread(self._upsert, city, records)
+            except sqlite3.Error as e:
+                print(f"Failed to store {len(records)} records for {city}: {e}")
+                return
+            self.changed[city] = self.changed.get(city, 0) + changed
+
+        self._pending[city] = asyncio.get_running_loop().create_task(upsert())
+
+    def flush_nowait(self) -> asyncio.Future:
+        """Returns a future that resolves once every page written so far is stored."""
+        pending = dict(self._pending)
+
+        async def wait():
+            await asyncio.gather(*pending.values())
+            for city, task in pending.items():
+                if self._pending.get(city) is task:
+                    del self._pending[city]
+
+        return asyncio.ensure_future(wait())
+
+    async def flush(self):
+        await self.flush_nowait()
+
+    async def close(self):
+        await self.flush()
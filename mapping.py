@@ -0,0 +1,127 @@
+import itertools
+from typing import Any, Callable, NamedTuple
+
+class Field(NamedTuple):
+    """Reads a dotted path from the source record, e.g. "MAP_DETAILS.LATITUDE" or "tuples.0.value"."""
+    path: str
+    default: Any = None
+
+class Compute(NamedTuple):
+    """Calls func(record) for values that are not a plain lookup."""
+    func: Callable[[dict[str, Any]], Any]
+
+class Equals(NamedTuple):
+    """True when the value of node equals value, e.g. Equals(Field("BEDROOM_NUM", 0), "1")."""
+    node: Any
+    value: Any
+
+class Const(NamedTuple):
+    """A constant value; plain literals in a spec are treated the same way."""
+    value: Any
+
+_INLINE_TYPES = (type(None), bool, int, float, str)
+
+def _is_constant(node: Any) -> bool:
+    if isinstance(node, (Field, Compute, Equals)):
+        return False
+    if isinstance(node, dict):
+        return all(_is_constant(child) for child in node.values())
+    if isinstance(node, list):
+        return all(_is_constant(child) for child in node)
+    return True
+
+def _constant_value(node: Any) -> Any:
+    if isinstance(node, Const):
+        return node.value
+    if isinstance(node, dict):
+        return {key: _constant_value(child) for key, child in node.items()}
+    if isinstance(node, list):
+        return [_constant_value(child) for child in node]
+    return node
+
+class _Compiler:
+    """Turns a mapping spec into straight-line Python with every lookup hoisted once."""
+
+    def __init__(self):
+        self.env: dict[str, Any] = {"_dict": dict, "_list": list}
+        self.lines: list[str] = []
+        self.lookups: dict[tuple, str] = {}
+        self.names = itertools.count()
+
+    def bind(self, value: Any, prefix: str) -> str:
+        name = f"_{prefix}{next(self.names)}"
+        self.env[name] = value
+        return name
+
+    def lookup(self, segments: tuple, default: Any = None) -> str:
+        if not segments:
+            return "prop"
+        default_expr = self.expr(Const(default))
+        key = (segments, default_expr)
+        if key in self.lookups:
+            return self.lookups[key]
+        holder = self.lookup(segments[:-1])
+        segment = segments[-1]
+        name = f"v{next(self.names)}"
+        if holder == "prop" and isinstance(segment, str):
+            # the source record itself is always a dict
+            self.lines.append(f"{name} = prop.get({segment!r}, {default_expr})")
+        elif isinstance(segment, int):
+            self.lines.append(f"{name} = {holder}[{segment}] if isinstance({holder}, _list) and len({holder}) > {segment} else {default_expr}")
+        else:
+            self.lines.append(f"{name} = {holder}.get({segment!r}, {default_expr}) if isinstance({holder}, _dict) else {default_expr}")
+        self.lookups[key] = name
+        return name
+
+    def expr(self, node: Any) -> str:
+        if isinstance(node, Field):
+            segments = tuple(int(part) if part.isdigit() else part for part in node.path.split("."))
+            return self.lookup(segments, node.default)
+        if isinstance(node, Compute):
+            return f"{self.bind(node.func, 'f')}(prop)"
+        if isinstance(node, Equals):
+            return f"({self.expr(node.node)} == {self.expr(Const(node.value))})"
+        if _is_constant(node):
+            value = _constant_value(node)
+            if isinstance(value, _INLINE_TYPES):
+                return repr(value)
+            # constant subtrees are built once and shared by every output record
+            return self.bind(value, "c")
+        if isinstance(node, dict):
+            return "{" + ", ".join(f"{key!r}: {self.expr(child)}" for key, child in node.items()) + "}"
+        if isinstance(node, list):
+            return "[" + ", ".join(self.expr(child) for child in node) + "]"
+        raise TypeError(f"Unsupported mapping node: {node!r}")
+
+def _build(spec: dict[str, Any], name: str, batch: bool) -> Callable:
+    compiler = _Compiler()
+    record_expr = compiler.expr(spec)
+    indent = "        " if batch else "    "
+    body = "".join(f"{indent}{line}\n" for line in compiler.lines)
+    if batch:
+        source = (
+            f"def {name}(props):\n"
+            f"    out = []\n"
+            f"    append = out.append\n"
+            f"    for prop in props:\n"
+            f"{body}"
+            f"        append({record_expr})\n"
+            f"    return out\n"
+        )
+    else:
+        source = f"def {name}(prop):\n{body}    return {record_expr}\n"
+    exec(compile(source, f"<mapping {name}>", "exec"), compiler.env)
+    func = compiler.env[name]
+    func.source = source
+    return func
+
+def compile_mapping(spec: dict[str, Any], name: str = "map_record") -> Callable[[dict[str, Any]], dict[str, Any]]:
+    """
+    Compiles a declarative spec into a function mapping one source record to an output record.
+    Constant sub-objects are shared between outputs, so treat the results as read-only.
+    """
+    return _build(spec, name, batch=False)
+
+def compile_batch_mapping(spec: dict[str, Any], name: str = "map_records") -> Callable[[list[dict[str, Any]]], list[dict[str, Any]]]:
+    """Like compile_mapping, but the generated function maps a whole list in one loop."""
+    return _build(spec, name, batch=True)
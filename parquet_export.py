@@ -0,0 +1,244 @@
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Callable
+from decoding import dumps
+from coerce import as_float, as_int
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Parquet export runs alongside the NDJSON sinks whenever pyarrow is installed.
+EXPORT_PARQUET = pa is not None
+PARQUET_DIR = os.path.join("output", "parquet")
+ROW_GROUP_SIZE = 5000
+
+def as_timestamp(value: Any) -> datetime | None:
+    """Epoch seconds or milliseconds (the *__U fields) as a UTC datetime."""
+    number = as_float(value)
+    if number is None or number <= 0:
+        return None
+    if number > 1e11:
+        number /= 1000
+    return datetime.fromtimestamp(number, tz=timezone.utc)
+
+def _dict(value: Any) -> dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+if pa is not None:
+    LISTING_SCHEMA = pa.schema([
+        ("prop_id", pa.string()),
+        ("name", pa.string()),
+        ("property_type", pa.string()),
+        ("status", pa.string()),
+        ("min_price", pa.float64()),
+        ("max_price", pa.float64()),
+        ("price_sqft", pa.float64()),
+        ("area_sqft", pa.float64()),
+        ("bedrooms", pa.int32()),
+        ("total_floors", pa.int32()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("address", pa.string()),
+        ("posted_at", pa.timestamp("ms", tz="UTC")),
+        ("updated_at", pa.timestamp("ms", tz="UTC")),
+        ("crawled_at", pa.timestamp("ms", tz="UTC")),
+    ])
+
+    BUILDER_PROJECT_SCHEMA = pa.schema([
+        ("builder_id", pa.string()),
+        ("builder_name", pa.string()),
+        ("total_projects", pa.int32()),
+        ("completed_projects", pa.int32()),
+        ("ongoing_projects", pa.int32()),
+        ("project_index", pa.int32()),
+        ("project", pa.string()),
+        ("crawled_at", pa.timestamp("ms", tz="UTC")),
+    ])
+
+def listing_rows(prop: dict[str, Any], crawled_at: datetime) -> list[dict[str, Any]]:
+    """One typed row per srp/search property."""
+    map_details = _dict(prop.get("MAP_DETAILS"))
+    tags = prop.get("SECONDARY_TAGS")
+    return [{
+        "prop_id": str(prop["PROP_ID"]) if prop.get("PROP_ID") is not None else None,
+        "name": prop.get("PROP_NAME"),
+        "property_type": str(prop["PROPERTY_TYPE"]) if prop.get("PROPERTY_TYPE") is not None else None,
+        "status": tags[0] if tags else None,
+        "min_price": as_float(prop.get("MIN_PRICE")),
+        "max_price": as_float(prop.get("MAX_PRICE")),
+        "price_sqft": as_float(prop.get("PRICE_SQFT")),
+        "area_sqft": as_float(prop.get("SUPERBUILTUP_SQFT")),
+        "bedrooms": as_int(prop.get("BEDROOM_NUM")),
+        "total_floors": as_int(prop.get("TOTAL_FLOOR")),
+        "latitude": as_float(map_details.get("LATITUDE")),
+        "longitude": as_float(map_details.get("LONGITUDE")),
+        "address": _dict(prop.get("location")).get("ADDRESS"),
+        "posted_at": as_timestamp(prop.get("POSTING_DATE__U")),
+        "updated_at": as_timestamp(prop.get("UPDATE_DATE__U")),
+        "crawled_at": crawled_at,
+    }]
+
+def builder_project_rows(builder: dict[str, Any], crawled_at: datetime) -> list[dict[str, Any]]:
+    """One row per scraped project, carrying the builder's columns; projects are kept as JSON."""
+    project_count = _dict(builder.get("projectCount"))
+    tuples = project_count.get("tuples") or []
+    base = {
+        "builder_id": str(builder.get("builderId")),
+        "builder_name": builder.get("name"),
+        "total_projects": as_int(_dict(project_count.get("total")).get("value")),
+        "completed_projects": as_int(_dict(tuples[0]).get("value")) if len(tuples) > 0 else None,
+        "ongoing_projects": as_int(_dict(tuples[1]).get("value")) if len(tuples) > 1 else None,
+        "crawled_at": crawled_at,
+    }
+    projects = builder.get("scraped_properties") or []
+    if not projects:
+        return [{**base, "project_index": None, "project": None}]
+    return [{**base, "project_index": i, "project": dumps(project)} for i, project in enumerate(projects)]
+
+class ParquetSink:
+    """
+    Writes typed rows to Parquet files partitioned as mode=<mode>/city=<city>/.
+
+    Rows are buffered per city and written as one row group every
+    ROW_GROUP_SIZE rows from a background thread; close() writes the
+    remainder and finalizes each file.
+
+    commit_nowait() finalizes the open part of every city so a checkpoint can
+    record it; the next rows of that city start a new part. resume() deletes
+    the parts of the same run the checkpoint did not record, which are the
+    rows written after it (and any part a crash left without a footer).
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        schema: "pa.Schema",
+        to_rows: Callable[[dict[str, Any], datetime], list[dict[str, Any]]],
+        directory: str = PARQUET_DIR,
+        row_group_size: int = ROW_GROUP_SIZE
+    ):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet export")
+        self.mode = mode
+        self.schema = schema
+        self.to_rows = to_rows
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.crawled_at = datetime.now(timezone.utc)
+        self.run_id = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        self.committed: list[str] = []
+        self._next_part: dict[str, int] = {}
+        # {city: path of the part its rows currently go to}
+        self._open: dict[str, str] = {}
+        self._buffers: dict[str, list[dict[str, Any]]] = {}
+        self._writers: dict[str, "pq.ParquetWriter"] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def path_for(self, city: str) -> str:
+        part = self._next_part.get(city, 0)
+        return os.path.join(self.directory, f"mode={self.mode}", f"city={city}", f"part-{self.run_id}-{part:04d}.parquet")
+
+    def resume(self, run_id: str, parts: list[str], next_part: dict[str, int]):
+        """Continues the run `run_id` of a checkpoint that recorded `parts` as finished."""
+        self.run_id = run_id
+        self.committed = list(parts)
+        self._next_part = dict(next_part)
+        mode_dir = os.path.join(self.directory, f"mode={self.mode}")
+        if not os.path.isdir(mode_dir):
+            return
+        for city_dir in os.listdir(mode_dir):
+            for name in os.listdir(os.path.join(mode_dir, city_dir)):
+                path = os.path.join(mode_dir, city_dir, name)
+                if name.startswith(f"part-{run_id}-") and path not in self.committed:
+                    print(f"Removing {path}, written after the checkpoint")
+                    os.remove(path)
+
+    def write(self, city: str, records: list[dict[str, Any]]):
+        buffer = self._buffers.setdefault(city, [])
+        for record in records:
+            try:
+                buffer.extend(self.to_rows(record, self.crawled_at))
+            except Exception as e:
+                print(f"Skipping record for {city} that could not be converted to a Parquet row: {e}")
+        if len(buffer) >= self.row_group_size:
+            self._schedule_write(city)
+
+    def _schedule_write(self, city: str):
+        rows = self._buffers.pop(city, [])
+        if not rows:
+            return
+        previous = self._pending.get(city)
+        path = self._open.setdefault(city, self.path_for(city))
+
+        async def write_row_group():
+            if previous is not None:
+                await previous
+            await asyncio.to_thread(self._write_row_group, path, rows)
+
+        self._pending[city] = asyncio.get_running_loop().create_task(write_row_group())
+
+    def _write_row_group(self, path: str, rows: list[dict[str, Any]]):
+        writer = self._writers.get(path)
+        if writer is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+            self._writers[path] = writer
+        writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def commit_nowait(self) -> "asyncio.Future[list[str]]":
+        """
+        Schedules every buffered row and closes the open parts once those rows
+        are in; the future resolves to every part finished so far. Rows written
+        after this call go to new parts.
+        """
+        for city in list(self._buffers):
+            self._schedule_write(city)
+        closing = [(path, self._pending.get(city)) for city, path in self._open.items()]
+        for city in self._open:
+            self._next_part[city] = self._next_part.get(city, 0) + 1
+        self._open.clear()
+
+        async def wait() -> list[str]:
+            for path, task in closing:
+                if task is not None:
+                    await task
+                writer = self._writers.pop(path, None)
+                if writer is not None:
+                    await asyncio.to_thread(writer.close)
+                    self.committed.append(path)
+            return list(self.committed)
+
+        return asyncio.ensure_future(wait())
+
+    def state(self) -> dict[str, Any]:
+        return {"run_id": self.run_id, "parts": list(self.committed), "next_part": dict(self._next_part)}
+
+    async def flush(self):
+        for city in list(self._buffers):
+            self._schedule_write(city)
+        pending = list(self._pending.values())
+        self._pending.clear()
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def close(self):
+        await self.flush()
+        writers = list(self._writers.values())
+        self._writers.clear()
+        self._open.clear()
+        for writer in writers:
+            await asyncio.to_thread(writer.close)
+
+def open_parquet_sink(mode: str, directory: str = PARQUET_DIR) -> ParquetSink | None:
+    """Returns the Parquet sink for a crawl mode, or None when export is disabled."""
+    if not EXPORT_PARQUET:
+        return None
+    if mode == "builders":
+        return ParquetSink(mode, BUILDER_PROJECT_SCHEMA, builder_project_rows, directory)
+    return ParquetSink(mode, LISTING_SCHEMA, listing_rows, directory)
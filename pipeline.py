@@ -0,0 +1,96 @@
+import math
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple
+
+PAGE_SIZE = 25
+IN_FLIGHT_PAGES = 5
+
+class PageCrawlResult(NamedTuple):
+    total_count: int
+    planned_pages: int
+    fetched_pages: int
+    failed_pages: list[int]
+
+class PageProgress:
+    """
+    The pages of one search handled so far, e.g. as restored from a checkpoint.
+    crawl_pages records into it and skips the pages it already holds; once page 1
+    is recorded its plan is reused instead of fetching page 1 again.
+    """
+
+    def __init__(self, total_count: int | None = None, last_page: int | None = None, pages: Iterable[int] = (), complete: bool = False):
+        self.total_count = total_count
+        self.last_page = last_page
+        self.pages = set(pages)
+        self.complete = complete
+
+def plan_last_page(total_count: int, page_size: int = PAGE_SIZE, max_pages: int | None = None) -> int:
+    """The last page to fetch for `total_count` results, capped at max_pages."""
+    last_page = max(math.ceil(total_count / page_size), 1)
+    if max_pages is not None:
+        last_page = min(last_page, max_pages)
+    return last_page
+
+async def crawl_pages(
+    fetch_page: Callable[[int], Awaitable[dict[str, Any] | None]],
+    handle_page: Callable[[int, dict[str, Any]], bool | None],
+    page_size: int = PAGE_SIZE,
+    in_flight: int = IN_FLIGHT_PAGES,
+    max_pages: int | None = None,
+    progress: PageProgress | None = None
+) -> PageCrawlResult:
+    """
+    Fetches page 1, plans the full page range from its `count`, then keeps
+    `in_flight` page requests running until the range is exhausted.
+
+    fetch_page returns the decoded page, or None once it has given up on the
+    page after its own retries (see retry.py). handle_page is called with each
+    decoded page as it arrives and may return True to stop planning further work.
+    Pages are added to `progress` as soon as handle_page returns; it is marked
+    complete when no page was given up on.
+    """
+    progress = progress if progress is not None else PageProgress()
+    if 1 in progress.pages and progress.last_page is not None:
+        total_count, last_page = progress.total_count or 0, progress.last_page
+        print(f"Resuming with {len(progress.pages)} of {last_page} pages done for {total_count} results")
+        stopped = False
+        fetched = 0
+    else:
+        first_page = await fetch_page(1)
+        if first_page is None:
+            return PageCrawlResult(0, 0, 0, [1])
+
+        total_count = int(first_page.get("count") or 0)
+        last_page = plan_last_page(total_count, page_size, max_pages)
+        print(f"Planned {last_page} pages for {total_count} results")
+        progress.total_count, progress.last_page = total_count, last_page
+
+        stopped = bool(handle_page(1, first_page))
+        progress.pages.add(1)
+        fetched = 1
+
+    failed: list[int] = []
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for page in range(2, last_page + 1):
+        if page not in progress.pages:
+            queue.put_nowait(page)
+
+    async def worker():
+        nonlocal fetched, stopped
+        while not stopped:
+            try:
+                page = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            data = await fetch_page(page)
+            if data is None:
+                failed.append(page)
+                continue
+            fetched += 1
+            if handle_page(page, data):
+                stopped = True
+            progress.pages.add(page)
+
+    await asyncio.gather(*(worker() for _ in range(in_flight)))
+    progress.complete = not failed
+    return PageCrawlResult(total_count, last_page, fetched, sorted(failed))
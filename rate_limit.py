@@ -0,0 +1,126 @@
+import time
+import asyncio
+from typing import NamedTuple
+
+THROTTLE_STATUSES = (403, 429, 503)
+LATENCY_SPIKE_FACTOR = 3.0
+LATENCY_SMOOTHING = 0.1
+WARMUP_SAMPLES = 10
+DECREASE_COOLDOWN = 2.0
+
+class Budget(NamedTuple):
+    """Starting, lowest and highest request rate of an endpoint, in requests per second."""
+    rate: float
+    min_rate: float
+    max_rate: float
+
+# 2.5/s is the AsyncLimiter(5, 2) every scraper used before
+DEFAULT_BUDGETS = {
+    "srp/search": Budget(2.5, 0.5, 10),
+    "project/search": Budget(2.5, 0.5, 10),
+    "builder page": Budget(2.5, 0.5, 5),
+    "search page": Budget(1, 0.2, 3),
+}
+FALLBACK_BUDGET = Budget(1, 0.2, 3)
+
+class AdaptiveRate:
+    """
+    Spaces the requests of one endpoint 1/rate seconds apart and adjusts the
+    rate with AIMD: every clean response adds increase/rate, i.e. about
+    `increase` requests per second for each second of clean traffic, and a
+    throttling signal multiplies it by `decrease`. Decreases are at most one
+    per cooldown, so the requests already in flight when the server pushes
+    back only count once.
+
+    `async with rate:` waits for the next slot; observe() reports how the
+    request went.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget: Budget,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        cooldown: float = DECREASE_COOLDOWN,
+        spike_factor: float = LATENCY_SPIKE_FACTOR
+    ):
+        self.name = name
+        self.rate = budget.rate
+        self.min_rate = budget.min_rate
+        self.max_rate = budget.max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.spike_factor = spike_factor
+        self.latency: float | None = None
+        self.samples = 0
+        self.throttled = 0
+        self._next_slot = 0.0
+        self._last_decrease = 0.0
+
+    async def __aenter__(self) -> "AdaptiveRate":
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def _slow_down(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.throttled += 1
+        previous, self.rate = self.rate, max(self.min_rate, self.rate * self.decrease)
+        # let the slots already handed out at the old rate spread out as well
+        self._next_slot = max(self._next_slot, now + 1 / self.rate)
+        print(f"{self.name} rate {previous:.2f} -> {self.rate:.2f}/s after {reason}")
+
+    def observe(self, throttle_reason: str | None = None, latency: float | None = None):
+        """
+        Reports a finished request: a throttle_reason (e.g. "status 429" or
+        "challenge page") or a latency spike slows the endpoint down, anything
+        else speeds it up.
+        """
+        if throttle_reason is not None:
+            self._slow_down(throttle_reason)
+            return
+        if latency is not None:
+            typical = self.latency
+            self.latency = latency if typical is None else (1 - LATENCY_SMOOTHING) * typical + LATENCY_SMOOTHING * latency
+            self.samples += 1
+            if self.samples > WARMUP_SAMPLES and latency > self.spike_factor * typical:
+                self._slow_down(f"a {latency * 1000:.0f} ms response (typical {typical * 1000:.0f} ms)")
+                return
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+class AdaptiveLimiter:
+    """
+    The AdaptiveRate of every endpoint of a crawl, created on first use from
+    `budgets` (keyed by endpoint name). rates() is the current rate of each
+    endpoint for monitoring.
+    """
+
+    def __init__(self, budgets: dict[str, Budget] = DEFAULT_BUDGETS, **rate_options):
+        self.budgets = budgets
+        self.rate_options = rate_options
+        self.endpoints: dict[str, AdaptiveRate] = {}
+
+    def __getitem__(self, endpoint: str) -> AdaptiveRate:
+        rate = self.endpoints.get(endpoint)
+        if rate is None:
+            budget = self.budgets.get(endpoint, FALLBACK_BUDGET)
+            rate = self.endpoints[endpoint] = AdaptiveRate(endpoint, budget, **self.rate_options)
+        return rate
+
+    def rates(self) -> dict[str, float]:
+        return {name: rate.rate for name, rate in self.endpoints.items()}
+
+    def print_rates(self):
+        for name, rate in self.endpoints.items():
+            print(f"{name}: {rate.rate:.2f} requests/s, slowed down {rate.throttled} times")
@@ -0,0 +1,152 @@
+import random
+import asyncio
+import argparse
+from typing import Any, Awaitable, Callable, NamedTuple, TypeVar
+from curl_cffi.requests.models import Response
+from curl_cffi.requests.exceptions import RequestException
+from decoding import ResponseDecodeError
+from rate_limit import THROTTLE_STATUSES
+from credentials import AUTH_FAILURE_STATUSES
+from transport import Endpoint
+
+T = TypeVar("T")
+
+TRANSIENT = "transient"
+THROTTLED = "throttled"
+AUTH_EXPIRED = "auth expired"
+CHALLENGE = "challenge page"
+PERMANENT = "permanent"
+
+CITY_RETRY_BUDGET = 100
+
+class RetryPolicy(NamedTuple):
+    """
+    How one failure class is retried: at most max_attempts tries of a request
+    end in it, each retry waits an exponential backoff from base_delay capped
+    at max_delay, and refresh_credentials replaces the city's credential set
+    first.
+    """
+    max_attempts: int
+    base_delay: float = 0
+    max_delay: float = 0
+    refresh_credentials: bool = False
+
+DEFAULT_POLICIES = {
+    # connection resets and timeouts: a short wait, the credentials are fine
+    TRANSIENT: RetryPolicy(4, 1, 15),
+    # the adaptive limiter slows the endpoint down as well; this spaces out the page itself
+    THROTTLED: RetryPolicy(4, 5, 60),
+    AUTH_EXPIRED: RetryPolicy(3, refresh_credentials=True),
+    # the challenge sticks to the cookies, so it takes a browser login to clear
+    CHALLENGE: RetryPolicy(3, 5, 30, refresh_credentials=True),
+    PERMANENT: RetryPolicy(1),
+}
+
+class FetchFailure(Exception):
+    """A failed request, sorted into one of the failure classes; retry_after is the server's hint in seconds."""
+
+    def __init__(self, kind: str, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+def _retry_after(response: Response) -> float | None:
+    try:
+        return float(response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+def check_response(endpoint: Endpoint, response: Response):
+    """Raises the FetchFailure of a response that did not succeed."""
+    status = response.status_code
+    # the API answers expired credentials with 401 or 403
+    if status in AUTH_FAILURE_STATUSES:
+        raise FetchFailure(AUTH_EXPIRED, f"status {status}")
+    if status in THROTTLE_STATUSES:
+        raise FetchFailure(THROTTLED, f"status {status}", _retry_after(response))
+    if status >= 500:
+        raise FetchFailure(TRANSIENT, f"status {status}")
+    if status >= 400:
+        raise FetchFailure(PERMANENT, f"status {status}")
+    if endpoint.expects_json and "text/html" in response.headers.get("content-type", ""):
+        raise FetchFailure(CHALLENGE, "HTML instead of JSON")
+
+def classify(error: Exception) -> FetchFailure:
+    """The FetchFailure of an error raised while fetching or decoding; anything unexpected is permanent."""
+    if isinstance(error, FetchFailure):
+        return error
+    if isinstance(error, RequestException):
+        return FetchFailure(TRANSIENT, f"{type(error).__name__}: {error}")
+    if isinstance(error, ResponseDecodeError):
+        # a body cut short; challenge pages are caught by their content type first
+        return FetchFailure(TRANSIENT, f"undecodable response: {error}")
+    return FetchFailure(PERMANENT, f"{type(error).__name__}: {error}")
+
+def backoff(policy: RetryPolicy, retry: int, retry_after: float | None = None) -> float:
+    """Exponential backoff with equal jitter for the `retry`-th retry, at least retry_after."""
+    delay = min(policy.max_delay, policy.base_delay * 2 ** (retry - 1))
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    return max(delay, retry_after or 0)
+
+class RetryEngine:
+    """
+    Runs a request with the retry policy of each failure class it runs into.
+    Every retry is charged to the city's budget; once a city has spent
+    city_budget retries its failures give up straight away, so a city the
+    site has turned against does not hold the crawl up. The counts per class
+    are kept for the end-of-run summary.
+    """
+
+    def __init__(self, policies: dict[str, RetryPolicy] = DEFAULT_POLICIES, city_budget: int = CITY_RETRY_BUDGET):
+        self.policies = policies
+        self.city_budget = city_budget
+        self.spent: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+        self.given_up: dict[str, int] = {}
+
+    def _spend(self, city: str) -> bool:
+        spent = self.spent.get(city, 0)
+        if spent >= self.city_budget:
+            return False
+        self.spent[city] = spent + 1
+        if spent + 1 == self.city_budget:
+            print(f"{city} has used up its retry budget of {self.city_budget}; further failures give up")
+        return True
+
+    async def run(self, city: str, label: str, attempt: Callable[[], Awaitable[T]], credentials: Any = None) -> T:
+        """
+        Awaits attempt() until it returns. It raises FetchFailure, or any error
+        classify() sorts, to fail; the FetchFailure is raised once its class's
+        policy or the city's budget gives up. `credentials`, a CityCredentials,
+        is refreshed before retrying classes that ask for it.
+        """
+        tries: dict[str, int] = {}
+        while True:
+            stale = credentials.current if credentials is not None else None
+            try:
+                return await attempt()
+            except Exception as e:
+                failure = classify(e)
+            kind = failure.kind
+            policy = self.policies[kind]
+            tries[kind] = tries.get(kind, 0) + 1
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+            if tries[kind] >= policy.max_attempts or not self._spend(city):
+                self.given_up[kind] = self.given_up.get(kind, 0) + 1
+                print(f"Giving up on {label} of {city} after {sum(tries.values())} attempts: {kind}, {failure}")
+                raise failure
+            delay = backoff(policy, tries[kind], failure.retry_after)
+            print(f"{label} of {city} failed ({kind}, {failure}); retry {tries[kind]} in {delay:.1f}s")
+            if policy.refresh_credentials and credentials is not None:
+                await credentials.invalidate(stale)
+            if delay:
+                await asyncio.sleep(delay)
+
+    def print_summary(self):
+        for kind, count in self.failures.items():
+            print(f"{kind} failures: {count}, given up {self.given_up.get(kind, 0)}")
+
+retries = RetryEngine()
+
+def add_retry_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--retry-budget", type=int, default=CITY_RETRY_BUDGET, help="retries each city may spend on failed requests")
@@ -0,0 +1,112 @@
+import asyncio
+import argparse
+from typing import Any, Awaitable, Callable
+from curl_cffi import AsyncSession
+from proxy_pool import ProxyPool
+from work_queue import WorkQueue, WorkItem
+
+MAX_ACTIVE_CITIES = 4
+QUEUE_POLL_INTERVAL = 5
+
+def city_label(city: Any) -> str:
+    """Returns a printable name for a search URL string, a builder city dict or a CitySearch."""
+    if isinstance(city, dict):
+        return city.get("city") or city.get("url", "")
+    name = getattr(city, "city", None)
+    return name if isinstance(name, str) else str(city)
+
+async def run_cities(
+    session: AsyncSession,
+    cities: list[Any],
+    process_city: Callable[[AsyncSession, Any, ProxyPool, Any], Awaitable[None]],
+    proxies: ProxyPool,
+    results: Any,
+    max_active: int = MAX_ACTIVE_CITIES
+) -> dict[str, Exception]:
+    """
+    Runs process_city for every city as concurrent tasks sharing one session and proxy pool.
+    At most max_active cities run at a time, and a city that raises does not affect
+    the others. Returns the exceptions of failed cities keyed by city label.
+    """
+    active = asyncio.Semaphore(max_active)
+    failures: dict[str, Exception] = {}
+
+    async def run_city(city: Any):
+        label = city_label(city)
+        async with active:
+            try:
+                await process_city(session, city, proxies, results)
+            except Exception as e:
+                print(f"City {label} failed: {e}")
+                failures[label] = e
+            print("-" * 60)
+
+    await asyncio.gather(*(run_city(city) for city in cities))
+
+    if failures:
+        print(f"{len(failures)} of {len(cities)} cities failed: {', '.join(failures)}")
+    return failures
+
+async def run_queue_workers(
+    queue: WorkQueue,
+    worker_id: str,
+    kinds: list[str],
+    handle_item: Callable[[WorkItem], Awaitable[Any]],
+    concurrency: int,
+    poll_interval: float = QUEUE_POLL_INTERVAL
+) -> dict[str, int]:
+    """
+    Runs `concurrency` tasks that lease items of `kinds` one at a time and pass
+    them to handle_item, which returns the item's result or raises to fail it.
+    Idle tasks keep polling while other workers hold leases, since those items
+    may add more work or be reclaimed; all tasks return once nothing is open.
+    While an item runs its lease is renewed every third of the lease time, so a
+    slow browser login or long retry backoff does not hand it to another worker.
+    """
+    stats = {"done": 0, "failed": 0, "lost": 0}
+
+    async def heartbeat(item: WorkItem, label: str):
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            if not await asyncio.to_thread(queue.renew, item, worker_id):
+                print(f"Could not renew the lease on work item {label}")
+                return
+
+    async def worker():
+        while True:
+            items = await asyncio.to_thread(queue.claim, worker_id, 1, kinds)
+            if not items:
+                if not await asyncio.to_thread(queue.has_open_items, kinds):
+                    return
+                await asyncio.sleep(poll_interval)
+                continue
+            item = items[0]
+            label = " ".join(str(part) for part in (item.kind, item.mode, item.city, item.key, f"page {item.page}") if part)
+            renewing = asyncio.create_task(heartbeat(item, label))
+            try:
+                try:
+                    result = await handle_item(item)
+                finally:
+                    renewing.cancel()
+            except Exception as e:
+                status = await asyncio.to_thread(queue.fail, item, worker_id, str(e))
+                print(f"Work item {label} failed on attempt {item.attempts}, now {status}: {e}")
+                stats["failed"] += 1
+                continue
+            if await asyncio.to_thread(queue.complete, item, worker_id, result):
+                stats["done"] += 1
+            else:
+                print(f"Lease on work item {label} expired before it finished")
+                stats["lost"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected at least 1, got {number}")
+    return number
+
+def add_runner_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--max-active-cities", type=_positive_int, default=MAX_ACTIVE_CITIES, help=f"cities crawled at the same time (default {MAX_ACTIVE_CITIES})")
@@ -3,67 +3,149 @@ import math
 import json
 import time
 import asyncio
-import curl_cffi
+import argparse
 from typing import Any
+from functools import partial
 from curl_cffi import AsyncSession
 from curl_cffi.requests.models import Response
-from curl_cffi.requests.session import ProxySpec
-from curl_cffi.requests.exceptions import RequestException # Added RequestException
-from lxml import html
-from aiolimiter import AsyncLimiter
+from rate_limit import AdaptiveLimiter
+from proxy_pool import Egress, ProxyPool, add_proxy_args, open_proxy_pool
 from urllib.parse import urlencode, urlparse, parse_qs
 from common import get_authentication_token, decode_base64_string
 from common import encode_urlsafe_base64, calculate_md5_hash
 from common import generate_auth_token, regenerate_api_token
+from credentials import CityCredentials, CredentialsPool
+from retry import FetchFailure, AUTH_EXPIRED, check_response, retries, add_retry_args
+from runner import run_cities, run_queue_workers, add_runner_args, MAX_ACTIVE_CITIES
+from sink import OutputSinks, open_output_sinks, OUTPUT_DIR
+from work_queue import WorkQueue, WorkItem, add_queue_args, worker_output_dir
+from checkpoint import Checkpoint, add_checkpoint_args, checkpoint_name
+import transport
+from transport import BUILDER_PAGE, PROJECT_SEARCH, add_transport_args, transport_config, open_session, request_timings
+from listing_store import ListingStore, read_city_counts
+from catalog import add_catalog_args, select_cities, builder_job
+from final_formats import builder_to_final_format
+from decoding import decode_project_search_response
 from urllib.parse import urlencode, urljoin
 
-def get_json_from_html(html_str: str):
-    tree = html.fromstring(html_str)
-    script_xpath: str = '//script[contains(text(), "window.__initialData__=")]'
-    script_elements = tree.xpath(script_xpath)
-    if not script_elements:
-        print("No script tag containing 'window.__initialData__ =' found.")
-
-    script_content = script_elements[0].text_content()
-    start_marker = "window.__initialData__="
-    start_index = script_content.find(start_marker)
-    if start_index == -1:
-        print("start marker 'window.__initData__=' not found")
-
-    json_start_index = start_index + len(start_marker)
-    json_string_raw = script_content[json_start_index:].strip()
-    stack: list[str] = []
-
-    json_str_raw_len: int = len(json_string_raw)
-    json_end: int = 0
-    for i in range(0, json_str_raw_len):
-        ch = json_string_raw[i]
-        if ch == "{":
-            stack.append(ch)
-        elif ch == "}":
-            _ = stack.pop()
-            if not stack:
-                json_end = i + 1
-    try:
-        json_string_raw = json_string_raw[:json_end].strip()
-    except Exception as e:
-        print(f"Exception occured when stripping json: {e}")
+INITIAL_DATA_MARKER = re.compile(rb"window\.__initialData__\s*=\s*")
+_json_decoder = json.JSONDecoder()
+
+def get_json_from_html(html_doc: bytes | str) -> dict[str, Any]:
+    """
+    Decodes the object assigned to window.__initialData__ straight from the raw page.
+    Only the bytes after the marker are decoded, and raw_decode stops at the end of
+    the first JSON value, so no DOM is built and trailing script is never scanned.
+    """
+    if isinstance(html_doc, str):
+        html_doc = html_doc.encode("utf-8")
 
-    data: dict[str, Any] = {}
+    match = INITIAL_DATA_MARKER.search(html_doc)
+    if match is None:
+        print("No script containing 'window.__initialData__=' found.")
+        return {}
 
+    json_tail = html_doc[match.end():].decode("utf-8", errors="replace")
     try:
-        data = json.loads(json_string_raw)
+        data, _ = _json_decoder.raw_decode(json_tail)
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON: {e}")
+        return {}
 
+    if not isinstance(data, dict):
+        print(f"window.__initialData__ is a {type(data).__name__}, expected an object")
+        return {}
     return data
 
-async def process_city(session: AsyncSession, search_url: list[dict], limiter: AsyncLimiter, results: list[dict[str, Any]]):
-    """Processes all pages for a single city and stores data in the results dictionary."""
-    proxies: ProxySpec = ProxySpec(
-        http = "",
-        https = "",
-    )
+async def fetch_project_page(
+    session: AsyncSession,
+    search_url: dict,
+    data: dict[str, Any],
+    credentials: CityCredentials,
+    limiter: AdaptiveLimiter,
+    pg: int
+) -> list[dict[str, Any]] | None:
+    """
+    Fetches one page of api-aggregator/project/search for a builder, retried by the
+    retry engine according to how it fails. Returns None once the engine gave up on
+    the page, and an empty list when the response carries no project lists.
+    """
+    ref_url: str = f"https://www.99acres.com/new-projects-in-{search_url['city']}-ffid?builderid={data['builderId']}"
+    api_url: str = f"https://www.99acres.com/api-aggregator/project/search?builderid={data['builderId']}&builder={data['builderId']}&res_com=R&sortby=sab_default&cityID={search_url['id']}&page={pg}&noxid=Y&isAjax=true&city={search_url['id']}&platform=DESKTOP&lazy=true&recomGroupType=VSP&builderid={data['builderId']}&pageName=NPSRP&groupByConfigurations=true&lazy=true"
+    # api_url = "https://www.99acres.com/api-aggregator/project/search?" + urlencode(params)
+
+    async def attempt() -> list[dict[str, Any]]:
+        print("=" * 60)
+        print(f"api_url is: {api_url}")
+        creds = credentials.current
+        if creds is None:
+            raise FetchFailure(AUTH_EXPIRED, "no credentials available")
+        # response new Projects and secondary Projects
+        async with limiter[PROJECT_SEARCH.name] as rate:
+            headers = {'apitoken': creds.signer.sign(api_url), 'authorizationtoken': creds.auth_token, 'referer': ref_url}
+            response = await transport.get(session, PROJECT_SEARCH, api_url, headers, rate, credentials.egress, cookies=creds.cookies)
+        check_response(PROJECT_SEARCH, response)
+        propertyData = decode_project_search_response(response.content)
+        try:
+            projects = [*propertyData["newProjects"], *propertyData["secondaryNewProjects"]]
+        except KeyError:
+            return []
+        print(f"num of new projects: {len(propertyData['newProjects'])}")
+        print(f"num of secondary new projects: {len(propertyData['secondaryNewProjects'])}")
+        print("=" * 60)
+        return projects
+
+    try:
+        return await retries.run(search_url['city'], f"project page {pg} of builder {data['builderId']}", attempt, credentials)
+    except FetchFailure:
+        return None
+
+async def fetch_builder_projects(
+    session: AsyncSession,
+    search_url: dict,
+    data: dict[str, Any],
+    credentials: CityCredentials,
+    limiter: AdaptiveLimiter,
+    progress: dict[str, Any] | None = None
+) -> list[dict[str, Any]] | None:
+    """
+    Pages through api-aggregator/project/search for one builder using the city's credentials.
+    Returns None if the retry engine gave up on a page.
+    `progress` receives the next page, the remaining count and the projects so far
+    after every page, and a checkpointed one continues where it stopped.
+    """
+    progress = progress if progress is not None else {}
+    props_remaining = progress.get("remaining", data["projectCount"]["total"]["value"])
+
+    pg = progress.get("page", 1)
+    properties = progress.setdefault("projects", [])
+    if pg > 1:
+        print(f"Resuming builder {data['builderId']} at page {pg} with {len(properties)} projects")
+
+    while props_remaining > 0:
+        projects = await fetch_project_page(session, search_url, data, credentials, limiter, pg)
+        if projects is None:
+            return None
+        props_remaining -= len(projects)
+        properties += projects
+        print(f"page: {pg}, properties_remaining: {props_remaining}")
+        pg += 1
+        progress.update(page=pg, remaining=props_remaining)
+        if not projects:
+            break
+
+    return properties
+
+def projects_url(search_url: dict) -> str:
+    return f"https://www.99acres.com/new-projects-in-{search_url['city']}-ffid"
+
+async def collect_city_builders(session: AsyncSession, search_url: dict, egress: Egress) -> tuple[list[dict[str, Any]], list[int]]:
+    """
+    Reads the builder cards of every builder listing page of a city through the
+    proxy of `egress`, one card per builder. Returns the cards and the listing
+    pages given up on.
+    """
+    limiter = egress.limiter
 
     def append_builder_data(pageData, builder_data):
         components = pageData.get("components", [])
@@ -77,28 +159,14 @@ async def process_city(session: AsyncSession, search_url: list[dict], limiter: A
 
     builder_data = []
     print(f"getting builder data for: {search_url['url']}")
-    async with limiter:
-        headers = {
-            'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'accept-language': 'en-US,en;q=0.9',
-            'cache-control': 'no-cache',
-            'dnt': '1',
-            'pragma': 'no-cache',
-            'priority': 'u=0, i',
-            'sec-ch-ua': '"Chromium";v="133", "Not(A:Brand";v="99"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-            'sec-fetch-dest': 'document',
-            'sec-fetch-mode': 'navigate',
-            'sec-fetch-site': 'none',
-            'sec-fetch-user': '?1',
-            'upgrade-insecure-requests': '1',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36',
-        }
-        # response = await session.get(search_url["url"], headers=headers, proxies=proxies, impersonate="chrome")
-        response = await session.get(search_url["url"], headers=headers, impersonate="chrome")
 
-    response.raise_for_status()
+    async def fetch_first_page() -> Response:
+        async with limiter[BUILDER_PAGE.name] as rate:
+            response = await transport.get(session, BUILDER_PAGE, search_url["url"], {'sec-fetch-site': 'none'}, rate, egress)
+        check_response(BUILDER_PAGE, response)
+        return response
+
+    response = await retries.run(search_url['city'], "builder page 1", fetch_first_page)
     first_pg_data = get_json_from_html(response.content)
     builderSrp = first_pg_data.get("builderSrp", {})
     pageData = builderSrp.get("pageData", {})
@@ -111,10 +179,23 @@ async def process_city(session: AsyncSession, search_url: list[dict], limiter: A
     total_builders = basicDetails.get("resultCount", 0)
     end_page = math.ceil(total_builders / 10)
 
+    async def fetch_builder_page(url: str, referer: str) -> Response:
+        async with limiter[BUILDER_PAGE.name] as rate:
+            print(f"getting builder data from: {url}")
+            response = await transport.get(session, BUILDER_PAGE, url, {'referer': referer}, rate, egress)
+        check_response(BUILDER_PAGE, response)
+        return response
+
+    async def fetch_builder_page_retried(pg: int, url: str, referer: str) -> Response | None:
+        try:
+            return await retries.run(search_url['city'], f"builder page {pg}", partial(fetch_builder_page, url, referer))
+        except FetchFailure:
+            return None
+
     ref_url: str = search_url["url"]
 
     tasks = []
-    for pg in range(2, end_page):
+    for pg in range(2, end_page + 1):
         base_url: str = f"{search_url['url']}-page-{pg}"
         params: dict[str, Any] = {
             "city": search_url["city"],
@@ -125,36 +206,15 @@ async def process_city(session: AsyncSession, search_url: list[dict], limiter: A
 
         query_string = urlencode(params)
         complete_url = urljoin(base_url, f"?{query_string}")
-
-        async with limiter:
-            headers = {
-                'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                'accept-language': 'en-US,en;q=0.9',
-                'cache-control': 'no-cache',
-                'dnt': '1',
-                'pragma': 'no-cache',
-                'priority': 'u=0, i',
-                'referer': ref_url,
-                'sec-ch-ua': '"Chromium";v="133", "Not(A:Brand";v="99"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': '"Windows"',
-                'sec-fetch-dest': 'document',
-                'sec-fetch-mode': 'navigate',
-                'sec-fetch-site': 'same-origin',
-                'sec-fetch-user': '?1',
-                'upgrade-insecure-requests': '1',
-                'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36',
-            }
-
-            print(f"getting builder data from: {complete_url}")
-            # response = await session.get(complete_url, headers=headers, proxies=proxies, impersonate="chrome")
-            response = await session.get(complete_url, headers=headers, impersonate="chrome")
-            tasks.append(response)
-
+        tasks.append(fetch_builder_page_retried(pg, complete_url, ref_url))
         ref_url = complete_url
     responses = await asyncio.gather(*tasks)
 
-    for response in responses:
+    failed_pages = []
+    for pg, response in enumerate(responses, start=2):
+        if response is None:
+            failed_pages.append(pg)
+            continue
         first_pg_data = get_json_from_html(response.content)
         print(first_pg_data)
         builderSrp = first_pg_data.get("builderSrp", {})
@@ -162,313 +222,190 @@ async def process_city(session: AsyncSession, search_url: list[dict], limiter: A
 
         append_builder_data(pageData, builder_data)
 
-    # i have ids here I will iterate over these and get the projects
-    for data in builder_data:
-        ref_url: str = f"https://www.99acres.com/new-projects-in-{search_url['city']}-ffid?builderid={data['builderId']}"
-
-        retry = 0
-
-        while retry < 3:
-            # auth_token, encrypted_input, cookies = await get_authentication_token(ref_url, proxies["http"])
-            auth_token, encrypted_input, cookies = await get_authentication_token(ref_url)
-            if not (auth_token and cookies and encrypted_input):
-                print(f"Could not get initial tokens for {ref_url}. Retrying.")
-                retry += 1
+    if failed_pages:
+        print(f"builder pages failed for {search_url['city']}: {failed_pages}")
+    # a builder can move to another listing page while the pages are read; keep its first card
+    unique_builders = {}
+    for card in builder_data:
+        unique_builders.setdefault(str(card["builderId"]), card)
+    return list(unique_builders.values()), failed_pages
+
+async def process_city(
+    session: AsyncSession,
+    search_url: dict,
+    proxies: ProxyPool,
+    results: OutputSinks,
+    checkpoint: Checkpoint | None = None
+):
+    """
+    Processes all pages for a single city and streams each builder into the output sinks.
+    The city goes through one proxy of the pool, with that proxy's limiter.
+    Builders the checkpoint holds as written are skipped; builder listing pages are read again.
+    The city is only checkpointed as complete once no listing page and no builder was given up on.
+    """
+    progress = checkpoint.builder_city(search_url['city']) if checkpoint is not None else None
+    if progress is not None and progress.complete:
+        print(f"{search_url['city']} is complete in the checkpoint. Skipping.")
+        return
+    with proxies.lease() as egress:
+        builder_data, failed_pages = await collect_city_builders(session, search_url, egress)
+        failed = [f"builder page {pg}" for pg in failed_pages]
+
+        # i have ids here I will iterate over these and get the projects
+        # one credential set serves every builder's project pagination in this city
+        async with CityCredentials(projects_url(search_url), search_url['city'], egress) as credentials:
+            if credentials.current is None:
+                print(f"Could not get initial tokens for {projects_url(search_url)}. Skipping projects.")
             else:
-                break
-
-        if not (auth_token and cookies and encrypted_input):
-            print(f"Could not get initial tokens for {ref_url}. Skipping.")
-            continue
+                for data in builder_data:
+                    builder_id = str(data["builderId"])
+                    if progress is None:
+                        projects = await fetch_builder_projects(session, search_url, data, credentials, egress.limiter)
+                    elif builder_id in progress.done:
+                        continue
+                    else:
+                        projects = await fetch_builder_projects(session, search_url, data, credentials, egress.limiter, progress.partial.setdefault(builder_id, {}))
+                    if projects is None:
+                        # the pages fetched so far stay in the checkpoint for --resume
+                        failed.append(f"builder {builder_id}")
+                        continue
+                    data["scraped_properties"] = projects
+                    results.write(search_url['city'], [data])
+                    if progress is not None:
+                        progress.partial.pop(builder_id, None)
+                        progress.done.add(builder_id)
+                if failed:
+                    print(f"Failed for {search_url['city']}: {', '.join(failed)}")
+                if progress is not None:
+                    progress.complete = not failed
+
+async def work_builder_queue(
+    session: AsyncSession,
+    queue: WorkQueue,
+    worker_id: str,
+    jobs: list[dict],
+    proxies: ProxyPool,
+    results: OutputSinks,
+    max_active: int = MAX_ACTIVE_CITIES
+) -> dict[str, int]:
+    """
+    Works through the shared queue with any other workers. A "builder_list" item
+    reads a city's builder cards and queues page 1 of each builder; a "builder"
+    item fetches one project page and queues the next, carrying every project
+    fetched so far, while projects remain. The last page writes the builder.
+    """
+    by_city = {job["city"]: job for job in jobs}
+    seeded = 0
+    for job in jobs:
+        seeded += await asyncio.to_thread(queue.enqueue, "builder_list", job["city"], [1])
+    print(f"Worker {worker_id} seeded {seeded} new cities into {queue.path}")
+    pool = CredentialsPool(max_active, proxies)
+
+    async def handle_item(item: WorkItem) -> Any:
+        job = by_city.get(item.city)
+        if job is None:
+            raise LookupError(f"{item.city} is not in this worker's selection")
+        if item.kind == "builder_list":
+            with proxies.lease() as egress:
+                builders, failed_pages = await collect_city_builders(session, job, egress)
+            for card in builders:
+                payload = {"builder": card, "remaining": card["projectCount"]["total"]["value"]}
+                await asyncio.to_thread(queue.enqueue, "builder", job["city"], [1], key=str(card["builderId"]), payload=payload)
+            if failed_pages:
+                # builders already queued are ignored when the retry queues them again
+                raise RuntimeError(f"builder pages {failed_pages} failed")
+            return {"builders": len(builders)}
+
+        card, remaining = item.payload["builder"], item.payload["remaining"]
+        # the projects of the earlier pages travel in the payload, so the card
+        # never depends on which of those items happen to be marked done yet
+        earlier = item.payload.get("projects", [])
+        fetched = card["projectCount"]["total"]["value"] - remaining
+        if len(earlier) != fetched:
+            raise RuntimeError(f"item carries {len(earlier)} of the {fetched} projects of pages 1-{item.page - 1}")
+        projects = []
+        if remaining > 0:
+            credentials = await pool.get(projects_url(job), job["city"])
+            if credentials.current is None:
+                raise RuntimeError(f"could not get tokens for {projects_url(job)}")
+            projects = await fetch_project_page(session, job, card, credentials, credentials.egress.limiter, item.page)
+            if projects is None:
+                raise RuntimeError(f"gave up on project page {item.page} of builder {item.key}")
+        remaining -= len(projects)
+        if remaining > 0 and projects:
+            payload = {"builder": card, "remaining": remaining, "projects": earlier + projects}
+            await asyncio.to_thread(queue.enqueue, "builder", job["city"], [item.page + 1], key=item.key, payload=payload)
+        else:
+            card["scraped_properties"] = earlier + projects
+            results.write(job["city"], [card])
+        return {"projects": len(projects)}
 
-        headers = {
-          'accept': '*/*',
-          'accept-language': 'en-US,en;q=0.9',
-          'cache-control': 'no-cache',
-          'dnt': '1',
-          'pagename': 'NPSRP',
-          'platform': 'desktop',
-          'pragma': 'no-cache',
-          'priority': 'u=1, i',
-          'referer': ref_url,
-          'sec-ch-ua': '"Chromium";v="133", "Not(A:Brand";v="99"',
-          'sec-ch-ua-mobile': '?0',
-          'sec-ch-ua-platform': '"Windows"',
-          'sec-fetch-dest': 'empty',
-          'sec-fetch-mode': 'cors',
-          'sec-fetch-site': 'same-origin',
-          'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36',
-        }
-
-        props_remaining = data["projectCount"]["total"]["value"]
-
-        pg = 1
-        properties = []
-
-        while props_remaining > 0:
-
-            print("=" * 60)
-            api_url: str = f"https://www.99acres.com/api-aggregator/project/search?builderid={data['builderId']}&builder={data['builderId']}&res_com=R&sortby=sab_default&cityID={search_url['id']}&page={pg}&noxid=Y&isAjax=true&city={search_url['id']}&platform=DESKTOP&lazy=true&recomGroupType=VSP&builderid={data['builderId']}&pageName=NPSRP&groupByConfigurations=true&lazy=true"
-            # api_url = "https://www.99acres.com/api-aggregator/project/search?" + urlencode(params)
-            print(f"api_url is: {api_url}")
-            regenerated_token = regenerate_api_token(auth_token, api_url, "")
-            if not regenerated_token:
-                print(f"Failed to regenerate token for page {page}")
-                return None
-
-            headers['apitoken'] = regenerated_token
-            headers['authorizationtoken'] = auth_token
-
-            # response new Projects and secondary Projects
-            try:
-                # response = await session.get(api_url, headers=headers, cookies=cookies, proxies=proxies, impersonate="chrome")
-                response = await session.get(api_url, headers=headers, cookies=cookies, impersonate="chrome")
-                propertyData = response.json()
-                num_new_projs = len(propertyData["newProjects"])
-                num_sec_new_projs = len(propertyData["secondaryNewProjects"])
-                props_remaining -= num_new_projs
-                props_remaining -= num_sec_new_projs
-                properties += [*propertyData["newProjects"], *propertyData["secondaryNewProjects"]]
-                print(f"num of new projects: {num_new_projs}")
-                print(f"num of secondary new projects: {num_sec_new_projs}")
-                print(f"page: {pg}, properties_remaining: {props_remaining}")
-                pg += 1
-                if num_new_projs == 0 and num_sec_new_projs == 0:
-                    props_remaining = 0
-            except curl_cffi.requests.exceptions.HTTPError as e:
-                print(f"HTTP error occurred: {e}")
-                continue
-            except KeyError:
-                props_remaining = 0
-            except json.JSONDecodeError:
-                print(f"Response Content: {response.content[:200]}") # Log the start of the response
-            except Exception as e:
-                print(f"An error with exception: {e} has occured")
-            print("=" * 60)
-
-        data["scraped_properties"] = properties
-        results.append(data)
-
-    with open("scraped_data_builder.json", "w", encoding="utf-8") as file:
-        json.dump(results, file, indent=2)
-
-
-async def main():
-    search_result_urls = [
-        {"url": "https://www.99acres.com/builders-in-raipur-bffid", "city": "raipur", "id": 75},
-        {"url": "https://www.99acres.com/builders-in-vadodara-bffid", "city": "vadodara", "id": 96},
-        {"url": "https://www.99acres.com/builders-in-bhubaneswar-bffid", "city": "bhubaneswar", "id": 162},
-        {"url": "https://www.99acres.com/builders-in-mohali-bffid", "city": "mohali", "id": 172},
-        {"url": "https://www.99acres.com/builders-in-noida-bffid", "city": "noida", "id": 7},
-        {"url": "https://www.99acres.com/builders-in-nashik-bffid", "city": "nashik", "id": 151},
-        {"url": "https://www.99acres.com/builders-in-mysore-bffid", "city": "mysore", "id": 126},
-        {"url": "https://www.99acres.com/builders-in-agra-bffid", "city": "agra", "id": 197},
-        {"url": "https://www.99acres.com/builders-in-zirakpur-chandigarh-bffid", "city": "zirakpur-chandigarh", "id": 73},
-        {"url": "https://www.99acres.com/builders-in-secunderabad-bffid", "city": "secunderabad", "id": 268},
-        {"url": "https://www.99acres.com/builders-in-chandigarh-bffid", "city": "chandigarh", "id": 73},
-        {"url": "https://www.99acres.com/builders-in-delhi-bffid", "city": "delhi", "id": 1075722},
-        {"url": "https://www.99acres.com/builders-in-bhopal-bffid", "city": "bhopal", "id": 140},
-        {"url": "https://www.99acres.com/builders-in-meerut-bffid", "city": "meerut", "id": 207},
-        {"url": "https://www.99acres.com/builders-in-varanasi-bffid", "city": "varanasi", "id": 209},
-        {"url": "https://www.99acres.com/builders-in-hyderabad-bffid", "city": "hyderabad", "id": 269},
-        {"url": "https://www.99acres.com/builders-in-bareilly-bffid", "city": "bareilly", "id": 200},
-        {"url": "https://www.99acres.com/builders-in-thane-bffid", "city": "thane", "id": 219},
-        {"url": "https://www.99acres.com/builders-in-goa-bffid", "city": "goa", "id": 233},
-        {"url": "https://www.99acres.com/builders-in-patna-bffid", "city": "patna", "id": 71},
-        {"url": "https://www.99acres.com/builders-in-ahmedabad-bffid", "city": "ahmedabad", "id": 45},
-        {"url": "https://www.99acres.com/builders-in-kochi-bffid", "city": "kochi", "id": 131},
-        {"url": "https://www.99acres.com/builders-in-guntur-bffid", "city": "guntur", "id": 54},
-        {"url": "https://www.99acres.com/builders-in-trivandrum-bffid", "city": "trivandrum", "id": 138},
-        {"url": "https://www.99acres.com/builders-in-aurangabad-bffid", "city": "aurangabad", "id": 147},
-        {"url": "https://www.99acres.com/builders-in-allahabad-bffid", "city": "allahabad", "id": 199},
-        {"url": "https://www.99acres.com/builders-in-indore-bffid", "city": "indore", "id": 142},
-        {"url": "https://www.99acres.com/builders-in-rajkot-bffid", "city": "rajkot", "id": 94},
-        {"url": "https://www.99acres.com/builders-in-calicut-bffid", "city": "calicut", "id": 128},
-        {"url": "https://www.99acres.com/builders-in-madurai-bffid", "city": "madurai", "id": 188},
-        {"url": "https://www.99acres.com/builders-in-bangalore-bffid", "city": "bangalore", "id": 20},
-        {"url": "https://www.99acres.com/builders-in-visakhapatnam-bffid", "city": "visakhapatnam", "id": 62},
-        {"url": "https://www.99acres.com/builders-in-pune-bffid", "city": "pune", "id": 19},
-        {"url": "https://www.99acres.com/builders-in-udaipur-bffid", "city": "udaipur", "id": 181},
-        {"url": "https://www.99acres.com/builders-in-bhiwadi-bffid", "city": "bhiwadi", "id": 289},
-        {"url": "https://www.99acres.com/builders-in-vijayawada-bffid", "city": "vijayawada", "id": 61},
-        {"url": "https://www.99acres.com/builders-in-faridabad-bffid", "city": "faridabad", "id": 10},
-        {"url": "https://www.99acres.com/builders-in-dehradun-bffid", "city": "dehradun", "id": 211},
-        {"url": "https://www.99acres.com/builders-in-lucknow-bffid", "city": "lucknow", "id": 205},
-        {"url": "https://www.99acres.com/builders-in-panchkula-bffid", "city": "panchkula", "id": 256},
-        {"url": "https://www.99acres.com/builders-in-coimbato-bffid", "city": "coimbato", "id": 185},
-        {"url": "https://www.99acres.com/builders-in-ranchi-bffid", "city": "ranchi", "id": 117},
-        {"url": "https://www.99acres.com/builders-in-kota-bffid", "city": "kota", "id": 180},
-        {"url": "https://www.99acres.com/builders-in-ghaziabad-bffid", "city": "ghaziabad", "id": 9},
-        {"url": "https://www.99acres.com/builders-in-siliguri-bffid", "city": "siliguri", "id": 283},
-        {"url": "https://www.99acres.com/builders-in-guwahati-bffid", "city": "guwahati", "id": 67},
-        {"url": "https://www.99acres.com/builders-in-ludhiana-bffid", "city": "ludhiana", "id": 171},
-        {"url": "https://www.99acres.com/builders-in-mangalore-bffid", "city": "mangalore", "id": 125},
-        {"url": "https://www.99acres.com/builders-in-chennai-bffid", "city": "chennai", "id": 32},
-        {"url": "https://www.99acres.com/builders-in-jaipur-bffid", "city": "jaipur", "id": 177},
-        {"url": "https://www.99acres.com/builders-in-surat-bffid", "city": "surat", "id": 95},
-        {"url": "https://www.99acres.com/builders-in-trichy-bffid", "city": "trichy", "id": 192},
-        {"url": "https://www.99acres.com/builders-in-sonipat-bffid", "city": "sonipat", "id": 251},
-        {"url": "https://www.99acres.com/builders-in-nagpur-bffid", "city": "nagpur", "id": 150},
-        {"url": "https://www.99acres.com/builders-in-gurgaon-bffid", "city": "gurgaon", "id": 8},
-        {"url": "https://www.99acres.com/builders-in-mumbai-bffid", "city": "mumbai", "id": 12},
-        {"url": "https://www.99acres.com/builders-in-kanpur-bffid", "city": "kanpur", "id": 204},
-        {"url": "https://www.99acres.com/builders-in-thrissur-bffid", "city": "thrissur", "id": 137},
-        {"url": "https://www.99acres.com/builders-in-kolkata-bffid", "city": "kolkata", "id": 25},
-        {"url": "https://www.99acres.com/builders-in-kurnool-bffid", "city": "kurnool", "id": 55},
-        {"url": "https://www.99acres.com/builders-in-rajamahendravaram-bffid", "city": "rajamahendravaram", "id": 1125767},
-        {"url": "https://www.99acres.com/builders-in-gandhinagar-bffid", "city": "gandhinagar", "id": 46},
-        {"url": "https://www.99acres.com/builders-in-anand-bffid", "city": "anand", "id": 84},
-        {"url": "https://www.99acres.com/builders-in-bhimavaram-bffid", "city": "bhimavaram", "id": 559},
-        {"url": "https://www.99acres.com/builders-in-nellore-bffid", "city": "nellore", "id": 56},
-        {"url": "https://www.99acres.com/builders-in-navi-mumbai-bffid", "city": "navi-mumbai", "id": 15},
-        {"url": "https://www.99acres.com/builders-in-greater-noida-bffid", "city": "greater-noida", "id": 222},
-        {"url": "https://www.99acres.com/builders-in-delhi-ncr-bffid", "city": "delhi-ncr", "id": 1},
-        {"url": "https://www.99acres.com/builders-in-dharuhera-bffid", "city": "dharuhera", "id": 331},
-        {"url": "https://www.99acres.com/builders-in-bhavnagar-bffid", "city": "bhavnagar", "id": 87},
-        {"url": "https://www.99acres.com/builders-in-karnal-bffid", "city": "karnal", "id": 101},
-        {"url": "https://www.99acres.com/builders-in-ganjam-bffid", "city": "ganjam", "id": 498},
-        {"url": "https://www.99acres.com/builders-in-berhampur-bffid", "city": "berhampur", "id": 501},
-    ]
-
-    all_scraped_data = []
-    limiter = AsyncLimiter(5, 2)
-
-    async with AsyncSession() as session:
-        for url in search_result_urls[0:1]:
-            await process_city(session, url, limiter, all_scraped_data)
-            print("-" * 60)
-
-    with open("builder_data_results.json", "w", encoding="utf-8") as file:
-        json.dump(all_scraped_data, file, indent=2)
-
-    final_json_format = []
-    for tag in all_scraped_data.keys():
-        props = all_scraped_data[tag]
-        if not isinstance(props, list):
-            props = []
-        for prop in props:
-            if not isinstance(prop, dict):
-                print(f"Warning: Skipping non-dictionary item found in data for tag '{tag}': {prop}")
-                continue
-            prop_obj = {
-                    "description": prop["description"]["text"],
-                    "phone_numbers": [],
-                    "emails": [],
-                    "awards": [],
-                    "achievements": [],
-                    "faq": [],
-                    "status": "ACTIVE",
-                    "verification_status": {},
-                    "builder_grade": "",
-                    "builder_status": "",
-                    "business_potential": "",
-                    "social": None,
-                    "media": None,
-                    "certifications": [],
-                    "offices": [
-                        {
-                            "source": None,
-                            "address": None,
-                            "city_uid": None,
-                            "headoffice": False,
-                            "location_uid": None
-                            }
-                        ],
-                    "vision": None,
-                    "mission": None,
-                    "third_party_urls": [
-                        {
-                            "url": "",
-                            "name": ""
-                        }
-                    ],
-                    "created_date": {
-                        "$date": {
-                            "$numberLong": ""
-                        }
-                    },
-                    "name": prop["name"],
-                    "primary_email": "",
-                    "website": "",
-                    "total_projects": prop["projectCount"]["total"]["value"],
-                    "completed_projects": prop["projectCount"]["tuples"][0]["value"],
-                    "ongoing_projects": prop["projectCount"]["tuples"][1]["value"],
-                    "upcoming_projects": prop["projectCount"]["tuples"][1]["value"],
-                    "total_experience": None,
-                    "logo": prop["coverImage"]["url"],
-                    "id": prop["builderId"],
-                    "domain_id": "",
-                    "created_by": "",
-                    "uid": "",
-                    "testimonials": None,
-                    "cdata1": {
-                            "news": [
-                                {
-                                    "url": "",
-                                    "date": None,
-                                    "title": "",
-                                    "description": ""
-                                    }
-                                ],
-                            "blogs": [
-                                {
-                                    "url": "",
-                                    "date": None,
-                                    "title": "",
-                                    "sub_title": "",
-                                    "description": ""
-                                    }
-                                ],
-                            "press": [
-                                {
-                                    "url": "",
-                                    "date": None,
-                                    "title": "",
-                                    "description": ""
-                                    }
-                                ],
-                            "map_url": {
-                                "map_link": ""
-                                }
-                            },
-                    "chairman_info": {
-                            "title": None,
-                            "message": None,
-                            "image_url": None
-                            },
-                    "approval_status": "UPDATE_INPROGRESS",
-                    "leadership": [],
-                    "features": None,
-                    "advisors": None,
-                    "meta": None,
-                    "alias": prop["name"],
-                    "updated_date": {
-                            "$date": {
-                                "$numberLong": ""
-                                }
-                            },
-                    "updated_by": "",
-                    "cname_url": None,
-                    "theme": None,
-                    "is_synced": False,
-                    "telephony": None,
-                    "sip_phone_number": None,
-                    "sales_emails": [],
-                    "sales_sms_numbers": [],
-                    "sales_whatsapp_numbers": [],
-                    "is_client": None
-            }
-            final_json_format.append(prop_obj)
+    try:
+        stats = await run_queue_workers(queue, worker_id, ["builder_list", "builder"], handle_item, max_active)
+    finally:
+        await pool.close()
+    print(f"Worker {worker_id} finished {stats['done']} items ({stats['failed']} failed attempts); queue: {queue.summary()}")
+    return stats
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape builders and their projects from 99acres.")
+    add_catalog_args(parser)
+    add_queue_args(parser)
+    add_checkpoint_args(parser)
+    add_transport_args(parser)
+    add_proxy_args(parser)
+    add_retry_args(parser)
+    add_runner_args(parser)
+    args = parser.parse_args()
+    if args.queue and args.resume:
+        parser.error("the work queue keeps its own progress; run the worker again without --resume")
+    return args
+
+async def main(args: argparse.Namespace):
+    cities = select_cities(args, partial(read_city_counts, builders=True))
+    search_result_urls = [builder_job(city) for city in cities]
+
+    store = ListingStore()
+    queue = WorkQueue(args.queue) if args.queue else None
+    directory = worker_output_dir(args.worker_id) if queue else OUTPUT_DIR
+    # no cross-city index: a builder's projects are searched per city, so each city's card is its own record
+    results = open_output_sinks("builders", builder_to_final_format, directory, store=store)
+    proxies = open_proxy_pool(args)
+    retries.city_budget = args.retry_budget
+    checkpoint = None
+    if queue is None:
+        checkpoint = Checkpoint(checkpoint_name(args, "builders"), resume=args.resume, interval=args.checkpoint_interval)
+        checkpoint.track("builders", results)
 
     try:
-        with open("final_results_builder.json", "w", encoding="utf-8") as f:
-            json.dump(final_json_format, f, indent=4)
-        print("Data successfully saved to results.json")
-    except Exception as e:
-        print(f"Failed to write data to file: {e}")
+        async with open_session(transport_config(args)) as session:
+            if queue is None:
+                checkpoint.start()
+                await run_cities(session, search_result_urls, partial(process_city, checkpoint=checkpoint), proxies, results, args.max_active_cities)
+            else:
+                await work_builder_queue(session, queue, args.worker_id, search_result_urls, proxies, results, args.max_active_cities)
+    finally:
+        if checkpoint is not None:
+            await checkpoint.close()
+        await results.close()
+        store.close()
+        if queue is not None:
+            queue.close()
+
+    for city_name, count in results.raw.counts.items():
+        print(f"builders in {city_name}: {count}")
+    print(f"\nScraping complete. Data saved to {results.raw.directory} and {results.final.directory}")
+    for city_name, changed in results.store.changed.items():
+        print(f"new or updated builders in {city_name}: {changed}")
+    print(f"Listing store updated at {store.path}")
+    request_timings.print_summary()
+    proxies.print_health()
+    retries.print_summary()
+    if results.columnar is not None:
+        print(f"Parquet export written under {results.columnar.directory}")
 
 if __name__ == "__main__":
     start_time = time.time()
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
     end_time = time.time()
     print(f"Total execution time: {end_time - start_time:.2f} seconds")
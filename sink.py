@@ -0,0 +1,183 @@
+import os
+import asyncio
+from typing import Any, Callable, NamedTuple
+from decoding import dumps
+from parquet_export import ParquetSink, open_parquet_sink
+from listing_store import ListingStore, StoreSink
+from dedup import SeenIndex
+
+OUTPUT_DIR = "output"
+FLUSH_EVERY = 200
+
+class NdjsonSink:
+    """
+    Appends records as newline-delimited JSON to one file per city.
+
+    write() only buffers; once a city has FLUSH_EVERY pending lines they are
+    appended by a background thread, in order per city. close() flushes the
+    rest. An optional transform maps each record before it is serialized.
+    `offsets` holds each city file's size after its last completed write.
+    """
+
+    def __init__(self, directory: str, transform: Callable[[dict[str, Any]], dict[str, Any]] | None = None, flush_every: int = FLUSH_EVERY):
+        self.directory = directory
+        self.transform = transform
+        self.flush_every = flush_every
+        self.counts: dict[str, int] = {}
+        self.offsets: dict[str, int] = {}
+        self._buffers: dict[str, list[str]] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+        self._started: set[str] = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, city: str) -> str:
+        return os.path.join(self.directory, f"{city}.ndjson")
+
+    def resume(self, offsets: dict[str, int]):
+        """
+        Continues the files of an interrupted run: each file listed in `offsets`
+        is cut back to its recorded size and appended to from there.
+        """
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".ndjson") or path not in offsets:
+                continue
+            city = name[:-len(".ndjson")]
+            size = os.path.getsize(path)
+            if size < offsets[path]:
+                print(f"{path} is shorter than its checkpoint ({size} < {offsets[path]} bytes), appending at its end")
+            elif size > offsets[path]:
+                os.truncate(path, offsets[path])
+            self.offsets[city] = min(size, offsets[path])
+            self._started.add(city)
+
+    def write(self, city: str, records: list[dict[str, Any]]):
+        buffer = self._buffers.setdefault(city, [])
+        for record in records:
+            if self.transform is not None:
+                try:
+                    record = self.transform(record)
+                except Exception as e:
+                    print(f"Skipping record for {city} that could not be transformed: {e}")
+                    continue
+            buffer.append(dumps(record))
+            self.counts[city] = self.counts.get(city, 0) + 1
+        if len(buffer) >= self.flush_every:
+            self._schedule_flush(city)
+
+    def _schedule_flush(self, city: str):
+        lines = self._buffers.pop(city, [])
+        if not lines:
+            return
+        previous = self._pending.get(city)
+        # the first flush of a run starts the city's file afresh
+        mode = "a" if city in self._started else "w"
+        self._started.add(city)
+
+        async def flush() -> int:
+            if previous is not None:
+                await previous
+            self.offsets[city] = await asyncio.to_thread(self._write_lines, self.path_for(city), lines, mode)
+            return self.offsets[city]
+
+        self._pending[city] = asyncio.get_running_loop().create_task(flush())
+
+    @staticmethod
+    def _write_lines(path: str, lines: list[str], mode: str) -> int:
+        with open(path, mode, encoding="utf-8") as f:
+            f.write("\n".join(lines))
+            f.write("\n")
+            return f.tell()
+
+    def flush_nowait(self) -> "asyncio.Future[dict[str, int]]":
+        """
+        Schedules every buffered line at once and returns a future of each file's
+        size after exactly those lines, keyed by path. Nothing written after this
+        call is counted, which is what lets a checkpoint pair offsets with pages.
+        """
+        for city in list(self._buffers):
+            self._schedule_flush(city)
+        pending = dict(self._pending)
+        offsets = {self.path_for(city): end for city, end in self.offsets.items() if city not in pending}
+
+        async def wait() -> dict[str, int]:
+            ends = await asyncio.gather(*pending.values())
+            offsets.update((self.path_for(city), end) for city, end in zip(pending, ends))
+            for city, task in pending.items():
+                # later writes chain onto the newest task, so only finished ones are dropped
+                if self._pending.get(city) is task:
+                    del self._pending[city]
+            return offsets
+
+        return asyncio.ensure_future(wait())
+
+    async def flush(self) -> dict[str, int]:
+        """Writes out every buffered line, waits for pending writes and returns the file sizes."""
+        return await self.flush_nowait()
+
+    async def close(self):
+        await self.flush()
+
+class OutputSinks(NamedTuple):
+    raw: NdjsonSink
+    final: NdjsonSink
+    columnar: ParquetSink | None = None
+    store: StoreSink | None = None
+    seen: SeenIndex | None = None
+
+    def write(self, city: str, records: list[dict[str, Any]]):
+        if self.seen is not None:
+            # listings another city already produced are not stored or transformed again
+            records = self.seen.filter(city, records)
+        self.raw.write(city, records)
+        self.final.write(city, records)
+        if self.columnar is not None:
+            self.columnar.write(city, records)
+        if self.store is not None:
+            self.store.write(city, records)
+
+    def flush_nowait(self) -> "asyncio.Future[dict[str, int]]":
+        """
+        Schedules the buffered NDJSON lines and store upserts of every record
+        written so far; the future resolves to the NDJSON file sizes once they
+        are all on disk.
+        """
+        flushing = [self.raw.flush_nowait(), self.final.flush_nowait()]
+        if self.store is not None:
+            flushing.append(self.store.flush_nowait())
+
+        async def wait() -> dict[str, int]:
+            raw, final, *_ = await asyncio.gather(*flushing)
+            return {**raw, **final}
+
+        return asyncio.ensure_future(wait())
+
+    async def close(self):
+        closing = [self.raw.close(), self.final.close()]
+        if self.columnar is not None:
+            closing.append(self.columnar.close())
+        if self.store is not None:
+            closing.append(self.store.close())
+        await asyncio.gather(*closing)
+
+def open_output_sinks(
+    mode: str,
+    transform: Callable[[dict[str, Any]], dict[str, Any]],
+    directory: str = OUTPUT_DIR,
+    parquet: bool = True,
+    store: ListingStore | None = None,
+    seen: SeenIndex | None = None
+) -> OutputSinks:
+    """
+    Creates the raw and transformed sinks for a crawl mode, e.g. output/rent/raw/<city>.ndjson,
+    plus a Parquet sink under output/parquet/mode=<mode>/city=<city>/ when pyarrow is installed
+    and, if a listing store is given, a sink upserting every page into it. A seen index
+    drops records already written for another city before they reach any sink.
+    """
+    return OutputSinks(
+        NdjsonSink(os.path.join(directory, mode, "raw")),
+        NdjsonSink(os.path.join(directory, mode, "final"), transform),
+        open_parquet_sink(mode, os.path.join(directory, "parquet")) if parquet else None,
+        StoreSink(store, mode) if store is not None else None,
+        seen,
+    )
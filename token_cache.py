@@ -0,0 +1,107 @@
+import os
+import json
+import time
+from typing import Any
+from filelock import FileLock
+
+DEFAULT_CACHE_PATH = ".token_cache.json"
+DEFAULT_TTL = 30 * 60
+DEFAULT_MAX_ENTRIES = 256
+
+class TokenCache:
+    """
+    Disk-backed cache for the (api_token, encrypted_input, cookies) triple.
+
+    Entries are keyed by city, search URL and the proxy the browser went
+    through, since the site ties a token's cookies to the address that
+    obtained them. They expire at the earlier of the
+    token's own expiry and the configured TTL, and are evicted least recently
+    used first once max_entries is exceeded. Every read and write happens under
+    a file lock so several scraper processes can share one cache file.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = FileLock(f"{path}.lock")
+
+    @staticmethod
+    def make_key(url: str, city: str, proxy: str | None = None) -> str:
+        return f"{city}|{url}|{proxy}" if proxy else f"{city}|{url}"
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Token cache at {self.path} is unreadable, starting empty: {e}")
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _store(self, entries: dict[str, dict[str, Any]]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def _evict(self, entries: dict[str, dict[str, Any]], now: float):
+        for key in [k for k, v in entries.items() if v.get("expires_at", 0) <= now]:
+            del entries[key]
+        if len(entries) > self.max_entries:
+            by_last_used = sorted(entries, key=lambda k: entries[k].get("last_used", 0))
+            for key in by_last_used[:len(entries) - self.max_entries]:
+                del entries[key]
+
+    def get(self, url: str, city: str = "", proxy: str | None = None) -> tuple[str, str, dict[str, Any]] | None:
+        """Returns the cached triple for url/city/proxy, or None if missing or expired."""
+        key = self.make_key(url, city, proxy)
+        now = time.time()
+        with self.lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if entry.get("expires_at", 0) <= now:
+                del entries[key]
+                self._store(entries)
+                return None
+            entry["last_used"] = now
+            self._store(entries)
+        return entry["api_token"], entry["encrypted_input"], entry["cookies"]
+
+    def put(
+        self,
+        url: str,
+        city: str,
+        api_token: str,
+        encrypted_input: str,
+        cookies: dict[str, Any],
+        expires_at: float | None = None,
+        proxy: str | None = None
+    ):
+        """Stores a triple; expires_at is the token's own expiry, if known."""
+        now = time.time()
+        ttl_expiry = now + self.ttl
+        entry = {
+            "api_token": api_token,
+            "encrypted_input": encrypted_input,
+            "cookies": cookies,
+            "created": now,
+            "last_used": now,
+            "expires_at": min(expires_at, ttl_expiry) if expires_at else ttl_expiry,
+        }
+        with self.lock:
+            entries = self._load()
+            entries[self.make_key(url, city, proxy)] = entry
+            self._evict(entries, now)
+            self._store(entries)
+
+    def invalidate(self, url: str, city: str = "", proxy: str | None = None):
+        """Drops an entry, e.g. after the API rejected its token."""
+        with self.lock:
+            entries = self._load()
+            if entries.pop(self.make_key(url, city, proxy), None) is not None:
+                self._store(entries)
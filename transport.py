@@ -0,0 +1,250 @@
+import argparse
+from statistics import quantiles
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple
+from curl_cffi import AsyncSession
+from curl_cffi.aio import AsyncCurl
+from curl_cffi._wrapper import ffi
+from curl_cffi.const import CurlHttpVersion, CurlInfo, CurlMOpt, CurlOpt
+from curl_cffi.requests.models import Response
+from curl_cffi.requests.exceptions import RequestException
+from rate_limit import AdaptiveRate, THROTTLE_STATUSES
+from proxy_pool import Egress
+
+# CURLPIPE_MULTIPLEX: many requests share one HTTP/2 connection
+CURLPIPE_MULTIPLEX = 2
+
+HTTP_VERSIONS = {
+    "auto": None,
+    "1.1": CurlHttpVersion.V1_1,
+    "2": CurlHttpVersion.V2_0,
+}
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36'
+
+_BROWSER_HEADERS = {
+    'accept-language': 'en-US,en;q=0.9',
+    'cache-control': 'no-cache',
+    'dnt': '1',
+    'pragma': 'no-cache',
+    'sec-ch-ua': '"Chromium";v="133", "Not(A:Brand";v="99"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'user-agent': USER_AGENT,
+}
+
+# navigations to srp and builder listing pages; the first one of a crawl sends sec-fetch-site: none
+PAGE_HEADERS = MappingProxyType({
+    **_BROWSER_HEADERS,
+    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'priority': 'u=0, i',
+    'sec-fetch-dest': 'document',
+    'sec-fetch-mode': 'navigate',
+    'sec-fetch-site': 'same-origin',
+    'sec-fetch-user': '?1',
+    'upgrade-insecure-requests': '1',
+})
+
+_API_HEADERS = {
+    **_BROWSER_HEADERS,
+    'accept': '*/*',
+    'platform': 'desktop',
+    'priority': 'u=1, i',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-origin',
+}
+
+SRP_SEARCH_HEADERS = MappingProxyType({**_API_HEADERS, 'pagename': 'SRP'})
+PROJECT_SEARCH_HEADERS = MappingProxyType({**_API_HEADERS, 'pagename': 'NPSRP'})
+
+class Endpoint(NamedTuple):
+    """
+    One kind of request: its name in the timing summary and rate limiter, its
+    read-only header template and, where an endpoint needs them, its own
+    fingerprint settings. An HTML answer from a JSON endpoint is a challenge page.
+    """
+    name: str
+    headers: Mapping[str, str]
+    impersonate: str | None = None
+    http_version: CurlHttpVersion | None = None
+    expects_json: bool = False
+
+SRP_SEARCH = Endpoint("srp/search", SRP_SEARCH_HEADERS, expects_json=True)
+PROJECT_SEARCH = Endpoint("project/search", PROJECT_SEARCH_HEADERS, expects_json=True)
+SEARCH_PAGE = Endpoint("search page", PAGE_HEADERS)
+BUILDER_PAGE = Endpoint("builder page", PAGE_HEADERS)
+
+class TransportConfig(NamedTuple):
+    """
+    Session-wide transport settings. max_clients bounds the requests in flight;
+    max_host_connections bounds the connections per host, which with
+    multiplexing carry several HTTP/2 streams each. Finished connections stay
+    in a cache of max_connections for reuse, with TCP keep-alive probes.
+    """
+    impersonate: str = "chrome"
+    http_version: CurlHttpVersion | None = CurlHttpVersion.V2_0
+    multiplex: bool = True
+    max_clients: int = 20
+    max_host_connections: int = 6
+    max_connections: int = 32
+    keepalive: bool = True
+    timeout: float = 30
+
+TIMING_INFOS = [
+    CurlInfo.NAMELOOKUP_TIME,
+    CurlInfo.CONNECT_TIME,
+    CurlInfo.APPCONNECT_TIME,
+    CurlInfo.STARTTRANSFER_TIME,
+    CurlInfo.TOTAL_TIME,
+    CurlInfo.NUM_CONNECTS,
+]
+
+def _set_multi_option(acurl: AsyncCurl, option: CurlMOpt, value: int):
+    # curl_cffi declares the multi handle's option value as a pointer, so integers go in cast
+    acurl.setopt(option, ffi.cast("void *", value))
+
+def open_session(config: TransportConfig = TransportConfig()) -> AsyncSession:
+    """
+    Creates the AsyncSession every scraper shares. Must be called with the event
+    loop running; use it as `async with open_session(config) as session`.
+    """
+    acurl = AsyncCurl()
+    _set_multi_option(acurl, CurlMOpt.PIPELINING, CURLPIPE_MULTIPLEX if config.multiplex else 0)
+    _set_multi_option(acurl, CurlMOpt.MAX_HOST_CONNECTIONS, config.max_host_connections)
+    _set_multi_option(acurl, CurlMOpt.MAXCONNECTS, config.max_connections)
+    curl_options: dict[CurlOpt, Any] = {}
+    if config.multiplex:
+        # wait for a connection that can multiplex rather than opening another one
+        curl_options[CurlOpt.PIPEWAIT] = 1
+    if config.keepalive:
+        curl_options[CurlOpt.TCP_KEEPALIVE] = 1
+    return AsyncSession(
+        async_curl=acurl,
+        max_clients=config.max_clients,
+        impersonate=config.impersonate,
+        http_version=config.http_version,
+        timeout=config.timeout,
+        curl_options=curl_options,
+        curl_infos=TIMING_INFOS,
+    )
+
+class RequestTiming(NamedTuple):
+    """Seconds spent in each phase of one request; a reused connection has no dns, connect or tls time."""
+    dns: float
+    connect: float
+    tls: float
+    ttfb: float
+    total: float
+    new_connection: bool
+
+    @classmethod
+    def from_infos(cls, infos: dict[Any, Any]) -> "RequestTiming | None":
+        if CurlInfo.TOTAL_TIME not in infos:
+            return None
+        # libcurl reports each time from the start of the request
+        dns = infos[CurlInfo.NAMELOOKUP_TIME]
+        connected = max(infos[CurlInfo.CONNECT_TIME], dns)
+        handshaken = max(infos[CurlInfo.APPCONNECT_TIME], connected)
+        first_byte = max(infos[CurlInfo.STARTTRANSFER_TIME], handshaken)
+        return cls(dns, connected - dns, handshaken - connected, first_byte - handshaken, infos[CurlInfo.TOTAL_TIME], infos[CurlInfo.NUM_CONNECTS] > 0)
+
+class RequestTimings:
+    """Collects the RequestTiming of every request per endpoint for the end-of-run summary."""
+
+    PHASES = ("dns", "connect", "tls", "ttfb", "total")
+
+    def __init__(self):
+        self.timings: dict[str, list[RequestTiming]] = {}
+
+    def record(self, endpoint: str, response: Response) -> RequestTiming | None:
+        timing = RequestTiming.from_infos(response.infos)
+        if timing is not None:
+            self.timings.setdefault(endpoint, []).append(timing)
+        return timing
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """p50 and p95 in milliseconds of each phase, plus the share of requests on reused connections."""
+        report = {}
+        for endpoint, timings in self.timings.items():
+            row: dict[str, Any] = {"requests": len(timings), "reused": 1 - sum(t.new_connection for t in timings) / len(timings)}
+            for phase in self.PHASES:
+                values = sorted(getattr(t, phase) * 1000 for t in timings)
+                if len(values) > 1:
+                    cuts = quantiles(values, n=20, method="inclusive")
+                    row[phase] = (cuts[9], cuts[18])
+                else:
+                    row[phase] = (values[0], values[0])
+            report[endpoint] = row
+        return report
+
+    def print_summary(self):
+        for endpoint, row in self.summary().items():
+            phases = ", ".join(f"{phase} {row[phase][0]:.0f}/{row[phase][1]:.0f}" for phase in self.PHASES)
+            print(f"{endpoint}: {row['requests']} requests, {row['reused']:.0%} on reused connections, p50/p95 ms: {phases}")
+
+request_timings = RequestTimings()
+
+def throttle_reason(endpoint: Endpoint, response: Response) -> str | None:
+    """Why a response suggests the site wants fewer requests, or None for a clean one."""
+    if response.status_code in THROTTLE_STATUSES:
+        return f"status {response.status_code}"
+    if endpoint.expects_json and "text/html" in response.headers.get("content-type", ""):
+        return "challenge page"
+    return None
+
+async def get(
+    session: AsyncSession,
+    endpoint: Endpoint,
+    url: str,
+    headers: Mapping[str, str] | None = None,
+    rate: AdaptiveRate | None = None,
+    egress: Egress | None = None,
+    **kwargs
+) -> Response:
+    """
+    GETs url with the endpoint's header template plus `headers`, e.g. the
+    per-request tokens and referer, and records the request's timing. The
+    outcome is reported to `rate`, the endpoint's rate the caller waited for,
+    and to the health of `egress`, whose proxy the request goes through:
+
+        async with egress.limiter[SRP_SEARCH.name] as rate:
+            response = await transport.get(session, SRP_SEARCH, url, headers, rate, egress)
+    """
+    if egress is not None and egress.proxy is not None:
+        kwargs.setdefault("proxy", egress.proxy)
+    if endpoint.impersonate is not None:
+        kwargs.setdefault("impersonate", endpoint.impersonate)
+    if endpoint.http_version is not None:
+        kwargs.setdefault("http_version", endpoint.http_version)
+    try:
+        response = await session.get(url, headers={**endpoint.headers, **(headers or {})}, **kwargs)
+    except RequestException as e:
+        if rate is not None:
+            rate.observe(f"request error {type(e).__name__}")
+        if egress is not None:
+            egress.record(False)
+        raise
+    timing = request_timings.record(endpoint.name, response)
+    reason = throttle_reason(endpoint, response)
+    ttfb = timing.ttfb if timing is not None else None
+    if rate is not None:
+        rate.observe(reason, ttfb)
+    if egress is not None:
+        egress.record(reason is None, ttfb)
+    return response
+
+def add_transport_args(parser: argparse.ArgumentParser):
+    defaults = TransportConfig()
+    parser.add_argument("--http-version", choices=sorted(HTTP_VERSIONS), default="2", help="HTTP version of the shared session (default 2)")
+    parser.add_argument("--no-multiplex", action="store_true", help="open a connection per request instead of multiplexing HTTP/2 streams")
+    parser.add_argument("--max-clients", type=int, default=defaults.max_clients, help="requests in flight on the shared session")
+    parser.add_argument("--max-host-connections", type=int, default=defaults.max_host_connections, help="connections per host")
+
+def transport_config(args: argparse.Namespace) -> TransportConfig:
+    return TransportConfig(
+        http_version=HTTP_VERSIONS[args.http_version],
+        multiplex=not args.no_multiplex,
+        max_clients=args.max_clients,
+        max_host_connections=args.max_host_connections,
+    )
@@ -0,0 +1,204 @@
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from typing import Any, Iterable, NamedTuple
+from decoding import dumps, loads
+
+QUEUE_PATH = os.path.join("output", "work_queue.db")
+WORKERS_DIR = os.path.join("output", "workers")
+LEASE_SECONDS = 5 * 60
+MAX_ITEM_ATTEMPTS = 3
+BUSY_TIMEOUT_MS = 30_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    id            INTEGER PRIMARY KEY,
+    kind          TEXT NOT NULL,
+    mode          TEXT NOT NULL DEFAULT '',
+    city          TEXT NOT NULL,
+    item_key      TEXT NOT NULL DEFAULT '',
+    page          INTEGER NOT NULL,
+    payload       TEXT,
+    status        TEXT NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    worker        TEXT,
+    lease_expires REAL,
+    result        TEXT,
+    error         TEXT,
+    updated_at    REAL NOT NULL,
+    UNIQUE (kind, mode, city, item_key, page)
+);
+CREATE INDEX IF NOT EXISTS work_items_claim ON work_items (status, kind, page, id);
+CREATE INDEX IF NOT EXISTS work_items_lease ON work_items (status, lease_expires);
+"""
+
+class WorkItem(NamedTuple):
+    id: int
+    kind: str
+    mode: str
+    city: str
+    key: str
+    page: int
+    payload: Any
+    attempts: int
+
+class WorkQueue:
+    """
+    SQLite-backed queue of crawl work shared by any number of local worker processes.
+
+    Items are (kind, mode, city, key, page) tuples, e.g. ("listing", "rent",
+    "pune", "", 3) or ("builder", "", "pune", "<builderId>", 1); adding one
+    twice is a no-op, so every worker may seed the same plan. claim() leases
+    items to a worker for lease_seconds; complete() and fail() only succeed
+    while the caller still holds the lease. Leases that expire, e.g. because a
+    worker was killed, are reclaimed on the next claim, so at most the leased
+    pages of a dead worker are fetched again.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ITEM_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+
+    def _transaction(self, func, *args):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        return result
+
+    def enqueue(self, kind: str, city: str, pages: Iterable[int], mode: str = "", key: str = "", payload: Any = None) -> int:
+        """Adds one item per page; returns how many were not queued already."""
+        now = time.time()
+        encoded = dumps(payload) if payload is not None else None
+        rows = [(kind, mode, city, key, page, encoded, now) for page in pages]
+
+        def insert() -> int:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO work_items (kind, mode, city, item_key, page, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self.connection.total_changes - before
+
+        return self._transaction(insert) if rows else 0
+
+    def _reclaim_expired(self, now: float) -> int:
+        # an item whose every attempt ended in an expired lease keeps killing workers
+        return self.connection.execute(
+            "UPDATE work_items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = 'lease expired', worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now, now),
+        ).rowcount
+
+    def reclaim_expired(self) -> int:
+        """Returns expired leases to the pending state; claim() does this on its own."""
+        return self._transaction(self._reclaim_expired, time.time())
+
+    def claim(self, worker: str, limit: int = 1, kinds: Iterable[str] | None = None) -> list[WorkItem]:
+        """
+        Leases up to `limit` pending items to `worker`. Later pages are handed out
+        before first pages, so cities already started are finished before new ones.
+        """
+        kinds = list(kinds or [])
+
+        def lease() -> list[WorkItem]:
+            now = time.time()
+            reclaimed = self._reclaim_expired(now)
+            if reclaimed:
+                print(f"Reclaimed {reclaimed} expired work item leases")
+            where = "status = 'pending'"
+            if kinds:
+                where += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            rows = self.connection.execute(
+                f"SELECT id, kind, mode, city, item_key, page, payload, attempts FROM work_items "
+                f"WHERE {where} ORDER BY page > 1 DESC, id LIMIT ?",
+                (*kinds, limit),
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE work_items SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(worker, now + self.lease_seconds, now, row[0]) for row in rows],
+            )
+            return [
+                WorkItem(row_id, kind, mode, city, key, page, loads(payload) if payload else None, attempts + 1)
+                for row_id, kind, mode, city, key, page, payload, attempts in rows
+            ]
+
+        return self._transaction(lease)
+
+    def renew(self, item: WorkItem, worker: str) -> bool:
+        """Extends a lease still held by `worker`."""
+        now = time.time()
+        return self._transaction(lambda: self.connection.execute(
+            "UPDATE work_items SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND worker = ?",
+            (now + self.lease_seconds, now, item.id, worker),
+        ).rowcount == 1)
+
+    def complete(self, item: WorkItem, worker: str, result: Any = None) -> bool:
+        """Marks a leased item done; returns False if the lease was lost to another worker."""
+        encoded = dumps(result) if result is not None else None
+        return self._transaction(lambda: self.connection.execute(
+            "UPDATE work_items SET status = 'done', result = ?, error = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'leased' AND worker = ?",
+            (encoded, time.time(), item.id, worker),
+        ).rowcount == 1)
+
+    def fail(self, item: WorkItem, worker: str, error: str) -> str | None:
+        """
+        Releases a leased item after an error. It is retried later until it has
+        been attempted max_attempts times, then marked failed. Returns the new
+        status, or None if the lease was lost.
+        """
+        status = "failed" if item.attempts >= self.max_attempts else "pending"
+        updated = self._transaction(lambda: self.connection.execute(
+            "UPDATE work_items SET status = ?, error = ?, worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'leased' AND worker = ?",
+            (status, error, time.time(), item.id, worker),
+        ).rowcount == 1)
+        return status if updated else None
+
+    def summary(self) -> dict[str, int]:
+        """Number of items per status."""
+        with self.lock:
+            return dict(self.connection.execute("SELECT status, COUNT(*) FROM work_items GROUP BY status"))
+
+    def has_open_items(self, kinds: Iterable[str] | None = None) -> bool:
+        """True while any item (of `kinds`) is pending or leased, i.e. more work may still appear."""
+        kinds = list(kinds or [])
+        where = "status IN ('pending', 'leased')"
+        if kinds:
+            where += f" AND kind IN ({', '.join('?' * len(kinds))})"
+        with self.lock:
+            return self.connection.execute(f"SELECT EXISTS (SELECT 1 FROM work_items WHERE {where})", kinds).fetchone()[0] == 1
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def worker_output_dir(worker_id: str) -> str:
+    """Queue workers write their NDJSON and Parquet files under output/workers/<worker_id>/."""
+    return os.path.join(WORKERS_DIR, worker_id)
+
+def add_queue_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--queue", nargs="?", const=QUEUE_PATH, help=f"work through a shared SQLite work queue (default {QUEUE_PATH}) with any other workers")
+    parser.add_argument("--worker-id", default=default_worker_id(), help="name of this worker in the queue's leases")